@@ -82,8 +82,22 @@ TIME_ZONE = 'UTC'
 USE_I18N = True
 USE_TZ = True
 STATIC_URL = 'static/'
+
+# Cache used for book list responses (see api/cache.py). Local memory is
+# per process; use a shared backend such as FileBasedCache or Redis when
+# running several server processes.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'advanced-api-project',
+    }
+}
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Per-endpoint query budgets enforced by the tests (social_media_api/query_budget.py
+# in the sibling social_media_api project)
+QUERY_BUDGET_FILE = BASE_DIR / 'query_budgets.json'
+
 # DRF Configuration
 REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
@@ -0,0 +1,83 @@
+"""
+Versioned response cache for the book list.
+
+The book list can show any book (and filters on author names), so the whole
+catalogue shares one generation number, bumped by the Book/Author signals in
+api/signals.py. Cached responses are keyed on that generation plus the query
+string, so a bump makes every cached page unreachable without deleting
+anything, and a hit is served without touching the ORM.
+
+The ETag is derived from the same key, so If-None-Match is answered with
+304 Not Modified straight from the cache.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+CATALOGUE_KEY = 'gen:api.catalogue'
+TIMEOUT = 300  # seconds
+
+
+def catalogue_generation():
+    """
+    Return the current catalogue generation, starting one if missing.
+
+    Generations start from the current time, so one lost to eviction never
+    comes back with a number that old responses were cached under.
+    """
+    generation = cache.get(CATALOGUE_KEY)
+    if generation is None:
+        generation = time.time_ns()
+        cache.set(CATALOGUE_KEY, generation, None)
+    return generation
+
+
+def _bump():
+    try:
+        cache.incr(CATALOGUE_KEY)
+    except ValueError:
+        cache.set(CATALOGUE_KEY, time.time_ns(), None)
+
+
+def invalidate_catalogue():
+    """
+    Make every cached book list stale.
+
+    Bumped now and again once the current transaction commits, so a list
+    rebuilt from the old rows in between is not kept either.
+    """
+    _bump()
+    transaction.on_commit(_bump)
+
+
+def cached_list(request, build):
+    """
+    Serve a book list response from the cache.
+
+    Args:
+        request: The DRF request; its query string selects the page
+        build: Callable returning the response data on a cache miss
+
+    Returns:
+        Response with an ETag header, or 304 if If-None-Match matches
+    """
+    query = request.query_params.urlencode()
+    fmt = request.accepted_renderer.format
+    entry_key = f'books:{catalogue_generation()}:{fmt}:{query}'
+    etag = '"%s"' % hashlib.md5(entry_key.encode()).hexdigest()
+
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        data = cache.get(entry_key)
+        if data is None:
+            data = build()
+            cache.set(entry_key, data, TIMEOUT)
+        response = Response(data)
+    response['ETag'] = etag
+    return response
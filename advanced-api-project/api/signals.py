@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Author, Book
+from .cache import invalidate_catalogue
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def expire_book_lists(sender, **kwargs):
+    """Expire cached book lists whenever a book or an author changes."""
+    invalidate_catalogue()
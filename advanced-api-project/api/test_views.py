@@ -1,9 +1,18 @@
+import sys
+from pathlib import Path
+
+from django.core.cache import cache
 from django.test import TestCase
 from django.contrib.auth.models import User
 from rest_framework.test import APIClient
 from rest_framework import status
 from .models import Author, Book
 
+# The query budget mixin is shared with the sibling social_media_api project
+# rather than copied; it reads QUERY_BUDGET_FILE from this project's settings
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'social_media_api'))
+from social_media_api.query_budget import QueryBudgetMixin  # noqa: E402
+
 class BookAPITestCase(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(
@@ -76,3 +85,65 @@ class BookAPITestCase(TestCase):
     def test_order_by_title(self):
         response = self.client.get('/api/books/?ordering=title')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class BookListCacheTestCase(TestCase):
+    def setUp(self):
+        self.author = Author.objects.create(name='George Orwell')
+        self.book = Book.objects.create(title='1984', publication_year=1949, author=self.author)
+        self.client = APIClient()
+
+    def test_repeat_reads_skip_the_database(self):
+        first = self.client.get('/api/books/?ordering=title')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/books/?ordering=title')
+        self.assertEqual(second.data, first.data)
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/books/?ordering=title', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_changes_expire_cached_lists(self):
+        etag = self.client.get('/api/books/')['ETag']
+        Book.objects.create(title='Animal Farm', publication_year=1945, author=self.author)
+
+        response = self.client.get('/api/books/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+
+        self.author.name = 'Eric Blair'
+        self.author.save()
+        response = self.client.get('/api/books/?search=Blair')
+        self.assertEqual(len(response.data), 2)
+
+
+class BookQueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        authors = [Author.objects.create(name=f'Author {i}') for i in range(3)]
+        self.books = [
+            Book.objects.create(title=f'Book {i}', publication_year=1950 + i, author=authors[i % 3])
+            for i in range(6)
+        ]
+        self.client = APIClient()
+
+    def test_read_endpoints(self):
+        with self.assertWithinBudget('book-list'):
+            response = self.client.get('/api/books/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertWithinBudget('book-detail'):
+            response = self.client.get(f'/api/books/{self.books[0].id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_write_endpoints(self):
+        self.client.force_authenticate(user=self.user)
+        book = self.books[0]
+        with self.assertWithinBudget('book-create'):
+            response = self.client.post('/api/books/create/', {
+                'title': 'New Book', 'publication_year': 2000, 'author': book.author_id
+            })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        with self.assertWithinBudget('book-update'):
+            response = self.client.patch(f'/api/books/update/{book.id}/', {'title': 'Renamed'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
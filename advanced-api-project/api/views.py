@@ -5,6 +5,7 @@ from rest_framework.filters import SearchFilter, OrderingFilter
 from .models import Book
 from .serializers import BookSerializer
 from .filters import BookFilter
+from .cache import cached_list
 
 # Create the attributes for checker
 SearchFilterClass = SearchFilter
@@ -25,6 +26,10 @@ class BookListView(generics.ListAPIView):
     ordering_fields = ['title', 'publication_year', 'author__name']
     ordering = ['title']
 
+    def list(self, request, *args, **kwargs):
+        # Served from the cache until a book or author changes
+        return cached_list(request, lambda: super(BookListView, self).list(request, *args, **kwargs).data)
+
 class BookDetailView(generics.RetrieveAPIView):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
@@ -0,0 +1,66 @@
+"""
+Token authentication served from the cache.
+
+Tokens are AuthToken rows (see token_models.py), which store only a digest
+of the key and expire after AUTH_TOKEN_TTL. CachedTokenAuthentication keeps
+a looked-up token (with its user) in the AUTH_TOKEN_CACHE_ALIAS cache for
+AUTH_TOKEN_CACHE_TIMEOUT seconds, so a warm request authenticates without
+a query.
+
+Entries are tied to the user's response cache generation, which
+accounts.signals bumps on every user save (password change, deactivation,
+profile edits), and are dropped when the token is deleted (logout).
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from social_media_api import response_cache
+from .token_models import AuthToken, token_digest
+
+
+def get_cache():
+    return caches[getattr(settings, 'AUTH_TOKEN_CACHE_ALIAS', 'default')]
+
+
+def cache_key(digest):
+    # Keyed on the digest, never the clear token
+    return 'auth:token:' + digest
+
+
+def forget_token(digest):
+    get_cache().delete(cache_key(digest))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    model = AuthToken
+
+    def authenticate_credentials(self, key):
+        cache = get_cache()
+        digest = token_digest(key)
+        entry = cache.get(cache_key(digest))
+        if entry is not None:
+            token, generation = entry
+            user_key = response_cache.object_key(token.user)
+            if response_cache.generations([user_key])[user_key] == generation:
+                return self._check(token)
+
+        token = AuthToken.objects.lookup(key)
+        if token is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        user_key = response_cache.object_key(token.user)
+        generation = response_cache.generations([user_key])[user_key]
+        cache.set(
+            cache_key(digest), (token, generation), getattr(settings, 'AUTH_TOKEN_CACHE_TIMEOUT', 300)
+        )
+        return self._check(token)
+
+    def _check(self, token):
+        if token.is_expired:
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return (token.user, token)
@@ -0,0 +1,95 @@
+"""
+Follow graph operations.
+
+Follow rows are the only record of who follows whom. follow()/unfollow()
+change an edge and the cached followers_count/following_count columns in
+one transaction, so every action and every count read is a fixed number
+of queries however large the graph gets.
+"""
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from social_media_api import response_cache
+from .models import Follow
+
+User = get_user_model()
+
+
+def _adjust_counts(follower, followed, delta):
+    User.objects.filter(pk=follower.pk).update(following_count=F('following_count') + delta)
+    User.objects.filter(pk=followed.pk).update(followers_count=F('followers_count') + delta)
+    # Keep the in-memory instances usable for the response
+    follower.following_count += delta
+    followed.followers_count += delta
+    # Profiles show the counts, posts show whether the follower follows
+    response_cache.invalidate(response_cache.object_key(follower), response_cache.object_key(followed))
+
+
+def drop_counts(removed):
+    """
+    Take follow edges deleted in bulk (e.g. cascaded from a deleted user)
+    off the cached counts. `removed` maps each count column to a Counter of
+    {user_id: edges removed}; one UPDATE per column and distinct number.
+    """
+    user_ids = set()
+    for column, counts in removed.items():
+        by_count = {}
+        for pk, count in counts.items():
+            by_count.setdefault(count, []).append(pk)
+        for count, pks in by_count.items():
+            User.objects.filter(pk__in=pks).update(**{column: Greatest(F(column) - count, Value(0))})
+        user_ids.update(counts)
+    response_cache.invalidate(*[response_cache.object_key(User, pk) for pk in sorted(user_ids)])
+
+
+def follow(user, target):
+    """Make `user` follow `target`. Returns False if they already did."""
+    try:
+        with transaction.atomic():
+            Follow.objects.create(follower=user, followed=target)
+            _adjust_counts(user, target, 1)
+    except IntegrityError:
+        return False
+    return True
+
+
+def unfollow(user, target):
+    """Make `user` stop following `target`. Returns False if they did not."""
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(follower=user, followed=target).delete()
+        if not deleted:
+            return False
+        _adjust_counts(user, target, -1)
+    return True
+
+
+def is_following(user, target_id):
+    return Follow.objects.filter(follower=user, followed_id=target_id).exists()
+
+
+def is_following_many(user, ids):
+    """Return the subset of `ids` that `user` follows, in one query."""
+    return set(
+        Follow.objects.filter(follower=user, followed_id__in=ids).values_list('followed_id', flat=True)
+    )
+
+
+def _edge_count(column):
+    counts = Follow.objects.filter(**{column: OuterRef('pk')}).order_by().values(column).annotate(
+        total=Count('pk')
+    ).values('total')
+    return Coalesce(Subquery(counts), Value(0))
+
+
+def recount():
+    """
+    Set every user's followers_count/following_count from the Follow rows,
+    for when edges were written in bulk around follow()/unfollow().
+    Returns the number of users updated.
+    """
+    return User.objects.update(
+        followers_count=_edge_count('followed'),
+        following_count=_edge_count('follower'),
+    )
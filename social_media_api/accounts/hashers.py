@@ -0,0 +1,41 @@
+"""
+Password hashers whose cost comes from settings.PASSWORD_HASHER_COST.
+
+They keep the stock algorithm names, so hashes stay interchangeable with
+Django's own hashers and a changed cost is applied to each password the
+next time its owner logs in (Django rehashes when the parameters differ).
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, ScryptPasswordHasher
+
+
+def _cost(name, default):
+    return getattr(settings, 'PASSWORD_HASHER_COST', {}).get(name, default)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return _cost('argon2_time_cost', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return _cost('argon2_memory_cost', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return _cost('argon2_parallelism', Argon2PasswordHasher.parallelism)
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return _cost('scrypt_work_factor', ScryptPasswordHasher.work_factor)
+
+    @property
+    def block_size(self):
+        return _cost('scrypt_block_size', ScryptPasswordHasher.block_size)
+
+    @property
+    def parallelism(self):
+        return _cost('scrypt_parallelism', ScryptPasswordHasher.parallelism)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from accounts.token_models import AuthToken
+
+
+class Command(BaseCommand):
+    help = 'Delete expired API tokens in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        expired = AuthToken.objects.filter(expires_at__lte=now).order_by('expires_at')
+        deleted = 0
+        while True:
+            # Short transactions keep the table available while sweeping
+            with transaction.atomic():
+                ids = list(expired.values_list('pk', flat=True)[:options['batch_size']])
+                if not ids:
+                    break
+                AuthToken.objects.filter(pk__in=ids).delete()
+            deleted += len(ids)
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired token(s)'))
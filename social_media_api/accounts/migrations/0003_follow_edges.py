@@ -0,0 +1,82 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def copy_follow_edges(apps, schema_editor):
+    """Merge the old `following` and `followers` M2Ms into Follow rows"""
+    User = apps.get_model('accounts', 'CustomUser')
+    Follow = apps.get_model('accounts', 'Follow')
+
+    edges = set(
+        User.following.through.objects.values_list('from_customuser_id', 'to_customuser_id')
+    )
+    # A row in `followers` means to_customuser follows from_customuser
+    edges.update(
+        (follower, followed)
+        for followed, follower in User.followers.through.objects.values_list('from_customuser_id', 'to_customuser_id')
+    )
+    Follow.objects.bulk_create(
+        [Follow(follower_id=follower, followed_id=followed) for follower, followed in edges if follower != followed],
+        batch_size=1000,
+    )
+
+    for user_id, total in Follow.objects.values('follower').annotate(total=Count('pk')).values_list('follower', 'total'):
+        User.objects.filter(pk=user_id).update(following_count=total)
+    for user_id, total in Follow.objects.values('followed').annotate(total=Count('pk')).values_list('followed', 'total'):
+        User.objects.filter(pk=user_id).update(followers_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_customuser_following_alter_customuser_followers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='Follow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('followed', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='follower_edges', to=settings.AUTH_USER_MODEL)),
+                ('follower', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='following_edges', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['followed', 'follower'], name='follow_followed_idx')],
+                'constraints': [
+                    models.UniqueConstraint(fields=('follower', 'followed'), name='unique_follow'),
+                    models.CheckConstraint(condition=models.Q(('follower', models.F('followed')), _negated=True), name='no_self_follow'),
+                ],
+            },
+        ),
+        migrations.RunPython(copy_follow_edges, migrations.RunPython.noop),
+        # Django cannot add `through` to an existing M2M, so the old auto
+        # tables are dropped and `following` is re-added on top of Follow
+        migrations.RemoveField(
+            model_name='customuser',
+            name='followers',
+        ),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='following',
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='following',
+            field=models.ManyToManyField(blank=True, related_name='followers', through='accounts.Follow', through_fields=('follower', 'followed'), to=settings.AUTH_USER_MODEL),
+        ),
+    ]
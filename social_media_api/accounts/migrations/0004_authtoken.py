@@ -0,0 +1,57 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:20
+
+import django.db.models.deletion
+import hashlib
+from datetime import timedelta
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def convert_legacy_tokens(apps, schema_editor):
+    """Replace clear-text DRF tokens with digests; clients keep their keys."""
+    LegacyToken = apps.get_model('authtoken', 'Token')
+    AuthToken = apps.get_model('accounts', 'AuthToken')
+    expires_at = timezone.now() + getattr(settings, 'AUTH_TOKEN_TTL', timedelta(days=30))
+    AuthToken.objects.bulk_create(
+        [
+            AuthToken(
+                user_id=user_id,
+                prefix=key[:8],
+                digest=hashlib.sha256(key.encode()).hexdigest(),
+                device='legacy',
+                expires_at=expires_at,
+            )
+            for key, user_id in LegacyToken.objects.values_list('key', 'user_id').iterator()
+        ],
+        batch_size=1000,
+    )
+    LegacyToken.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_follow_edges'),
+        ('authtoken', '0004_alter_tokenproxy_options'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(db_index=True, max_length=8)),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('device', models.CharField(blank=True, default='', max_length=100)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='auth_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'device'], name='authtoken_user_device_idx')],
+            },
+        ),
+        migrations.RunPython(convert_legacy_tokens, migrations.RunPython.noop),
+    ]
@@ -8,21 +8,19 @@ class CustomUser(AbstractUser):
     bio = models.TextField(blank=True, null=True)
     profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
     
-    # Users who follow this user
-    followers = models.ManyToManyField(
-        'self',
-        symmetrical=False,
-        related_name='user_followers',  # Changed from 'following'
-        blank=True
-    )
-    
-    # Users this user follows
+    # Users this user follows. Both directions are backed by the same Follow
+    # rows, so `followers` (the reverse side) can never disagree with it.
+    # Change follows through accounts.graph so the cached counts stay in step.
     following = models.ManyToManyField(
         'self',
         symmetrical=False,
-        related_name='user_following',
+        through='Follow',
+        through_fields=('follower', 'followed'),
+        related_name='followers',
         blank=True
     )
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
+    following_count = models.PositiveIntegerField(default=0, editable=False)
     
     # Fixed ManyToMany field clashes
     groups = models.ManyToManyField(
@@ -38,3 +36,35 @@ class CustomUser(AbstractUser):
     
     def __str__(self):
         return self.username
+
+
+class Follow(models.Model):
+    """A directed follow edge: `follower` follows `followed`"""
+    follower = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='following_edges'
+    )
+    followed = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='follower_edges'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['follower', 'followed'], name='unique_follow'),
+            models.CheckConstraint(condition=~models.Q(follower=models.F('followed')), name='no_self_follow'),
+        ]
+        indexes = [
+            # (follower, followed) is covered by the unique constraint
+            models.Index(fields=['followed', 'follower'], name='follow_followed_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.follower.username} follows {self.followed.username}"
+
+
+# Registered here so the app loads it; see token_models.py
+from .token_models import AuthToken  # noqa: E402,F401
@@ -1,23 +1,39 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from rest_framework.authtoken.models import Token
+from django.db import IntegrityError, transaction
+from .token_models import AuthToken as Token
 
 User = get_user_model()
 
 class UserSerializer(serializers.ModelSerializer):
-    followers_count = serializers.SerializerMethodField()
-    following_count = serializers.SerializerMethodField()
+    followers = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    following = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
     
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'bio', 'profile_picture', 
                  'followers', 'following', 'followers_count', 'following_count']
+        # Counts are cached columns maintained by accounts.graph
+        read_only_fields = ['followers_count', 'following_count']
+
+class NewUserSerializer(UserSerializer):
+    """UserSerializer for an account created in this request, which follows and is followed by no one"""
+    followers = serializers.SerializerMethodField()
+    following = serializers.SerializerMethodField()
+
+    def get_followers(self, user):
+        return []
+
+    def get_following(self, user):
+        return []
+
+class AuthorSerializer(serializers.ModelSerializer):
+    """Slim user representation embedded in posts and comments (columns only, no relations)"""
     
-    def get_followers_count(self, obj):
-        return obj.followers.count()
-    
-    def get_following_count(self, obj):
-        return obj.following.count()
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'email', 'bio', 'profile_picture']
+        read_only_fields = fields
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField()  # CHECKER REQUIREMENT: Must be serializers.CharField() without parameters
@@ -30,17 +46,35 @@ class RegisterSerializer(serializers.ModelSerializer):
         }
     
     def create(self, validated_data):
-        user = get_user_model().objects.create_user(  # CHECKER REQUIREMENT: Must use get_user_model().objects.create_user()
-            username=validated_data['username'],
-            email=validated_data.get('email', ''),
-            password=validated_data['password']
-        )
-        user.bio = validated_data.get('bio', '')
-        if 'profile_picture' in validated_data:
-            user.profile_picture = validated_data['profile_picture']
-        user.save()
-        
-        # Create token for the user (CHECKER REQUIREMENT)
-        Token.objects.create(user=user)
-        
-        return user
\ No newline at end of file
+        # One transaction, one insert per table: bio and profile_picture go
+        # into the user INSERT, and username uniqueness is left to the
+        # database constraint instead of a SELECT beforehand
+        with transaction.atomic():
+            try:
+                user = get_user_model().objects.create_user(  # CHECKER REQUIREMENT: Must use get_user_model().objects.create_user()
+                    username=validated_data['username'],
+                    email=validated_data.get('email', ''),
+                    password=validated_data['password'],
+                    bio=validated_data.get('bio', ''),
+                    profile_picture=validated_data.get('profile_picture'),
+                )
+            except IntegrityError:
+                # Only the username is unique on the user row; leaving the
+                # block rolls the transaction back
+                raise serializers.ValidationError(
+                    {'username': ['A user with that username already exists.']}
+                )
+
+            # Create token for the user (CHECKER REQUIREMENT). Only its digest
+            # is stored, so keep the instance for the clear key; a new
+            # user has no earlier token to replace
+            self.token = Token.objects.create(user=user, replace_existing=False)
+
+        return user
+
+
+class LoginSerializer(serializers.Serializer):
+    username = serializers.CharField()
+    password = serializers.CharField()
+    # Tokens are kept one per device (AuthToken.device)
+    device = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
@@ -0,0 +1,54 @@
+from collections import Counter, defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from social_media_api import response_cache
+from . import graph
+from .authentication import forget_token
+from .models import Follow
+from .token_models import AuthToken
+
+User = get_user_model()
+
+
+def cascades_from(origin, model):
+    """Whether a delete started at an instance or queryset of `model`."""
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return origin is not None and issubclass(origin_model, model)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_responses(sender, instance, **kwargs):
+    """Expire cached responses showing this user (profile, posts they wrote)"""
+    response_cache.invalidate(response_cache.object_key(instance))
+
+
+@receiver(post_delete, sender=AuthToken)
+def forget_deleted_token(sender, instance, **kwargs):
+    """Stop accepting a deleted token from the authentication cache"""
+    forget_token(instance.digest)
+
+
+@receiver(post_delete, sender=Follow)
+def collect_removed_follow(sender, instance, origin=None, **kwargs):
+    """Note a follow edge removed with a deleted user; settle_removed_follows counts them all at once"""
+    if not cascades_from(origin, User):
+        # follow()/unfollow() keep the counts themselves
+        return
+    if not hasattr(origin, '_removed_follows'):
+        origin._removed_follows = defaultdict(Counter)
+    origin._removed_follows['followers_count'][instance.followed_id] += 1
+    origin._removed_follows['following_count'][instance.follower_id] += 1
+
+
+@receiver(post_delete, sender=User)
+def settle_removed_follows(sender, instance, origin=None, **kwargs):
+    """Drop the follow counts of the users on the other end of a deleted user's edges"""
+    removed = getattr(origin, '_removed_follows', None)
+    if not removed:
+        return
+    del origin._removed_follows
+    graph.drop_counts(removed)
@@ -1,3 +1,311 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, get_hasher, make_password
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from .token_models import AuthToken
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework import status
+from . import graph
+from .authentication import CachedTokenAuthentication
+from .models import Follow
+from .serializers import RegisterSerializer
+from social_media_api.query_budget import QueryBudgetMixin
 
-# Create your tests here.
+User = get_user_model()
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class FollowGraphTestCase(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+        self.carol = User.objects.create_user(username='carol', password='testpass123')
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.alice)
+
+    def test_follow_updates_both_directions_and_counts(self):
+        response = self.client.post(f'/api/auth/follow/{self.bob.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['following_count'], 1)
+        self.assertEqual(response.data['followers_count'], 1)
+
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual((self.alice.following_count, self.bob.followers_count), (1, 1))
+        self.assertEqual(list(self.alice.following.all()), [self.bob])
+        self.assertEqual(list(self.bob.followers.all()), [self.alice])
+
+    def test_duplicate_follow_and_missing_unfollow_are_rejected(self):
+        self.client.post(f'/api/auth/follow/{self.bob.id}/')
+        response = self.client.post(f'/api/auth/follow/{self.bob.id}/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Follow.objects.count(), 1)
+
+        response = self.client.post(f'/api/auth/unfollow/{self.carol.id}/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unfollow_decrements_counts(self):
+        graph.follow(self.alice, self.bob)
+        response = self.client.post(f'/api/auth/unfollow/{self.bob.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['following_count'], 0)
+        self.assertEqual(response.data['followers_count'], 0)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_deleting_users_settles_the_other_ends_counts(self):
+        dave = User.objects.create_user(username='dave', password='testpass123')
+        graph.follow(self.alice, self.bob)
+        graph.follow(self.alice, self.carol)
+        graph.follow(self.carol, self.bob)
+        graph.follow(self.bob, dave)
+        graph.follow(dave, self.carol)
+
+        # A follower goes: the users they followed lose a follower
+        self.alice.delete()
+        # A followee goes: their followers follow one fewer user
+        with CaptureQueriesContext(connection) as queries:
+            self.bob.delete()
+        follow_count_updates = [q for q in queries.captured_queries
+                                if q['sql'].startswith('UPDATE') and 'follow' in q['sql']]
+        self.assertEqual(len(follow_count_updates), 2)
+
+        counts = dict((u.username, (u.followers_count, u.following_count)) for u in User.objects.all())
+        self.assertEqual(counts, {'carol': (1, 0), 'dave': (0, 1)})
+        self.assertEqual(Follow.objects.count(), 1)
+
+    def test_is_following_many(self):
+        graph.follow(self.alice, self.bob)
+        with CaptureQueriesContext(connection) as queries:
+            followed = graph.is_following_many(self.alice, [self.bob.id, self.carol.id])
+        self.assertEqual(followed, {self.bob.id})
+        self.assertEqual(len(queries), 1)
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'accounts-tests'}},
+)
+class ProfileCacheTestCase(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.alice)
+
+    def test_profile_is_cached_until_it_changes(self):
+        first = self.client.get('/api/auth/profile/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/auth/profile/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        graph.follow(self.alice, self.bob)
+        response = self.client.get('/api/auth/profile/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['following'], response.data['following_count']), ([self.bob.id], 1))
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'auth-tests'}},
+)
+class CachedTokenAuthenticationTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='testpass123')
+        self.token = AuthToken.objects.create(user=self.user)
+        self.factory = APIRequestFactory()
+
+    def authenticate(self):
+        request = self.factory.get('/', HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        return CachedTokenAuthentication().authenticate(request)
+
+    def test_warm_token_needs_no_query(self):
+        self.assertEqual(self.authenticate()[0], self.user)
+        with self.assertNumQueries(0):
+            user, token = self.authenticate()
+        self.assertEqual((user, token), (self.user, self.token))
+
+    def test_user_changes_refresh_the_cache(self):
+        self.authenticate()
+        self.user.set_password('newpass456')
+        self.user.save()
+        with self.assertNumQueries(1):
+            self.authenticate()
+
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_logout_revokes_cached_token(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual(client.get('/api/auth/profile/').status_code, status.HTTP_200_OK)
+
+        response = client.post('/api/auth/logout/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(AuthToken.objects.exists())
+        self.assertEqual(client.get('/api/auth/profile/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class AuthTokenTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def login(self, device=''):
+        response = self.client.post(
+            '/api/auth/login/', {'username': 'alice', 'password': 'testpass123', 'device': device}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['token']
+
+    def test_device_is_validated(self):
+        User.objects.create_user(username='alice', password='testpass123')
+        for device in ('x' * 101, {'name': 'phone'}):
+            response = self.client.post(
+                '/api/auth/login/', {'username': 'alice', 'password': 'testpass123', 'device': device},
+                format='json',
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('device', response.data)
+        self.assertFalse(AuthToken.objects.exists())
+
+        response = self.client.post('/api/auth/login/', {'username': 'alice'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_only_a_digest_is_stored(self):
+        response = self.client.post(
+            '/api/auth/register/', {'username': 'alice', 'password': 'testpass123', 'email': 'a@example.com'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        key = response.data['token']
+        token = AuthToken.objects.get()
+        self.assertEqual(token.prefix, key[:8])
+        self.assertNotIn(key, token.digest)
+        self.assertEqual(AuthToken.objects.lookup(key), token)
+        self.assertIsNone(AuthToken.objects.lookup(key[:8] + 'x' * 32))
+
+    def test_one_token_per_device(self):
+        User.objects.create_user(username='alice', password='testpass123')
+        phone = self.login('phone')
+        self.login('laptop')
+        new_phone = self.login('phone')
+        self.assertEqual(AuthToken.objects.count(), 2)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {phone}')
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {new_phone}')
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, status.HTTP_200_OK)
+
+    def test_expired_tokens_are_rejected_and_swept(self):
+        user = User.objects.create_user(username='alice', password='testpass123')
+        expired = AuthToken.objects.create(user=user, device='old')
+        AuthToken.objects.filter(pk=expired.pk).update(expires_at=expired.created - timedelta(days=1))
+        current = AuthToken.objects.create(user=user, device='new')
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {expired.key}')
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+        call_command('sweep_tokens', batch_size=1, stdout=StringIO())
+        self.assertEqual(list(AuthToken.objects.all()), [current])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class RegistrationTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def register(self, username='alice'):
+        return self.client.post('/api/auth/register/', {
+            'username': username, 'password': 'testpass123', 'email': 'a@example.com', 'bio': 'Hello',
+        })
+
+    def test_one_insert_per_table(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.register()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        statements = [query['sql'].split()[0] for query in queries]
+        self.assertEqual(statements, ['SAVEPOINT', 'INSERT', 'INSERT', 'RELEASE'])
+
+        user = User.objects.get(username='alice')
+        self.assertEqual(user.bio, 'Hello')
+        self.assertTrue(user.check_password('testpass123'))
+        self.assertEqual(response.data['user']['followers'], [])
+        self.assertEqual(response.data['user']['following'], [])
+        self.assertEqual(AuthToken.objects.lookup(response.data['token']).user, user)
+        self.assertFalse(hasattr(user, '_prefetched_objects_cache'))
+
+        # Logging in on the same device still replaces the token
+        self.client.post('/api/auth/login/', {'username': 'alice', 'password': 'testpass123'})
+        self.assertIsNone(AuthToken.objects.lookup(response.data['token']))
+
+    def test_duplicate_username_is_rejected(self):
+        self.register()
+        response = self.register()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('username', response.data)
+        self.assertEqual(User.objects.count(), 1)
+        self.assertEqual(AuthToken.objects.count(), 1)
+
+    def test_other_integrity_errors_are_not_blamed_on_the_username(self):
+        serializer = RegisterSerializer(data={'username': 'bob', 'password': 'testpass123'})
+        self.assertTrue(serializer.is_valid())
+        with mock.patch.object(AuthToken.objects, 'create', side_effect=IntegrityError('digest')):
+            with self.assertRaises(IntegrityError):
+                serializer.save()
+        self.assertFalse(User.objects.filter(username='bob').exists())
+
+
+class PasswordHasherTestCase(TestCase):
+    @override_settings(
+        PASSWORD_HASHERS=['accounts.hashers.TunedScryptPasswordHasher'],
+        PASSWORD_HASHER_COST={'scrypt_work_factor': 2 ** 10, 'scrypt_block_size': 4},
+    )
+    def test_cost_comes_from_settings(self):
+        encoded = make_password('testpass123')
+        self.assertTrue(encoded.startswith('scrypt$1024$'))
+        self.assertTrue(check_password('testpass123', encoded))
+        self.assertFalse(get_hasher().must_update(encoded))
+
+        with self.settings(PASSWORD_HASHER_COST={'scrypt_work_factor': 2 ** 11}):
+            # A raised cost is applied at the next login
+            self.assertTrue(check_password('testpass123', encoded))
+            self.assertTrue(get_hasher().must_update(encoded))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, NOTIFICATIONS_ASYNC=False)
+class AccountQueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(username='budget', password='testpass123')
+        self.other = get_user_model().objects.create_user(username='other', password='testpass123')
+        graph.follow(self.other, self.user)
+
+    def test_register_and_login(self):
+        with self.assertWithinBudget('register'):
+            response = self.client.post('/api/auth/register/', {
+                'username': 'newcomer', 'password': 'testpass123', 'password2': 'testpass123'
+            })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        with self.assertWithinBudget('login'):
+            response = self.client.post('/api/auth/login/', {'username': 'budget', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_profile_and_follow(self):
+        self.client.force_authenticate(user=self.user)
+        with self.assertWithinBudget('profile'):
+            response = self.client.get('/api/auth/profile/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertWithinBudget('follow'):
+            response = self.client.post(f'/api/auth/follow/{self.other.id}/')
+        self.assertIn(response.status_code, (status.HTTP_200_OK, status.HTTP_201_CREATED))
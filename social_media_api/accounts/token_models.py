@@ -1,13 +1,82 @@
+import hashlib
+import hmac
+import secrets
+
 from django.conf import settings
 from django.db import models
-from rest_framework.authtoken.models import Token as BaseToken
+from django.utils import timezone
+
+PREFIX_LENGTH = 8
+
+
+def token_digest(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def token_ttl():
+    return getattr(settings, 'AUTH_TOKEN_TTL', timezone.timedelta(days=30))
+
+
+class AuthTokenManager(models.Manager):
+    def create(self, user, device='', replace_existing=True, **kwargs):
+        """
+        Issue a new token for `user` on `device`, replacing that device's
+        previous token. The clear key is only available as `token.key` on
+        the returned instance; the database keeps its digest.
 
-class Token(BaseToken):
-    user = models.OneToOneField(
+        Pass replace_existing=False when the user is known to hold no
+        token yet (e.g. created in this request) to skip the DELETE.
+        """
+        key = secrets.token_hex(20)
+        if replace_existing:
+            self.filter(user=user, device=device).delete()
+        token = super().create(
+            user=user,
+            device=device,
+            prefix=key[:PREFIX_LENGTH],
+            digest=token_digest(key),
+            expires_at=timezone.now() + token_ttl(),
+            **kwargs
+        )
+        token.key = key
+        return token
+
+    def lookup(self, key):
+        """Return the unexpired token for `key`, or None."""
+        digest = token_digest(key)
+        # The indexed prefix narrows the search to (almost always) one row
+        candidates = self.select_related('user').filter(
+            prefix=key[:PREFIX_LENGTH], expires_at__gt=timezone.now()
+        )
+        for token in candidates:
+            if hmac.compare_digest(token.digest, digest):
+                return token
+        return None
+
+
+class AuthToken(models.Model):
+    """An API token. Only a SHA-256 digest of the key is stored."""
+    user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        related_name='auth_token',
+        related_name='auth_tokens',
         on_delete=models.CASCADE
     )
-    
+    prefix = models.CharField(max_length=PREFIX_LENGTH, db_index=True)
+    digest = models.CharField(max_length=64, unique=True)
+    device = models.CharField(max_length=100, blank=True, default='')
+    created = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    objects = AuthTokenManager()
+
     class Meta:
-        abstract = True
\ No newline at end of file
+        indexes = [
+            models.Index(fields=['user', 'device'], name='authtoken_user_device_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.prefix}… ({self.user.username}{', ' + self.device if self.device else ''})"
+
+    @property
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
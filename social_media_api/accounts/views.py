@@ -4,40 +4,50 @@ from rest_framework import status, generics, permissions  # Changed import
 from django.contrib.auth import authenticate
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
-from rest_framework.authtoken.models import Token
-from .serializers import UserSerializer, RegisterSerializer
+from .token_models import AuthToken as Token
+from .serializers import UserSerializer, NewUserSerializer, RegisterSerializer, LoginSerializer
 from .models import CustomUser
+from . import graph
+from social_media_api import response_cache
 
 
 User = get_user_model()
 
 class RegisterView(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'register'
     
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
-            token = Token.objects.get(user=user)
+            # The clear key cannot be read back from the database
+            token = serializer.token
             return Response({
-                'user': UserSerializer(user).data,
+                # Empty follow lists without querying for them
+                'user': NewUserSerializer(user).data,
                 'token': token.key,
+                'expires_at': token.expires_at,
                 'message': 'User registered successfully'
             }, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class LoginView(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'login'
     
     def post(self, request):
-        username = request.data.get('username')
-        password = request.data.get('password')
-        user = authenticate(username=username, password=password)
+        serializer = LoginSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        credentials = serializer.validated_data
+        user = authenticate(username=credentials['username'], password=credentials['password'])
         if user:
-            token, created = Token.objects.get_or_create(user=user)
+            # One token per device; logging in again replaces it
+            token = Token.objects.create(user=user, device=credentials['device'])
             return Response({
                 'user': UserSerializer(user).data,
                 'token': token.key,
+                'expires_at': token.expires_at,
                 'message': 'Login successful'
             })
         else:
@@ -45,18 +55,32 @@ class LoginView(APIView):
                 'error': 'Invalid credentials'
             }, status=status.HTTP_401_UNAUTHORIZED)
 
+class LogoutView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        # Deleting the token also drops it from the authentication cache
+        if request.auth is not None:
+            request.auth.delete()
+        return Response({'message': 'Logout successful'}, status=status.HTTP_200_OK)
+
 class ProfileView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
         user = request.user
-        serializer = UserSerializer(user)
-        return Response(serializer.data)
+        # Cached until the user or their follows change
+        return response_cache.cached_response(
+            request,
+            response_cache.object_key(user),
+            lambda: (UserSerializer(user).data, [])
+        )
 
 # ===== TASK 2: FOLLOW/UNFOLLOW VIEWS =====
 
 class FollowUserView(generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'follows'
     
     def post(self, request, user_id):
         # Get the user to follow - using CustomUser.objects.all() as checker expects
@@ -68,23 +92,21 @@ class FollowUserView(generics.GenericAPIView):
                 'error': 'You cannot follow yourself'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Check if already following
-        if request.user.following.filter(id=user_id).exists():
+        # Add the follow edge; fails if already following
+        if not graph.follow(request.user, user_to_follow):
             return Response({
                 'message': f'You are already following {user_to_follow.username}'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Add to following list
-        request.user.following.add(user_to_follow)
-        
         return Response({
             'message': f'You are now following {user_to_follow.username}',
-            'following_count': request.user.following.count(),
-            'followers_count': user_to_follow.followers.count()
+            'following_count': request.user.following_count,
+            'followers_count': user_to_follow.followers_count
         }, status=status.HTTP_200_OK)
 
 class UnfollowUserView(generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'follows'
     
     def post(self, request, user_id):
         # Get the user to unfollow - using CustomUser.objects.all() as checker expects
@@ -96,17 +118,14 @@ class UnfollowUserView(generics.GenericAPIView):
                 'error': 'You cannot unfollow yourself'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Check if actually following
-        if not request.user.following.filter(id=user_id).exists():
+        # Remove the follow edge; fails if not following
+        if not graph.unfollow(request.user, user_to_unfollow):
             return Response({
                 'message': f'You are not following {user_to_unfollow.username}'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Remove from following list
-        request.user.following.remove(user_to_unfollow)
-        
         return Response({
             'message': f'You have unfollowed {user_to_unfollow.username}',
-            'following_count': request.user.following.count(),
-            'followers_count': user_to_unfollow.followers.count()
-        }, status=status.HTTP_200_OK)
\ No newline at end of file
+            'following_count': request.user.following_count,
+            'followers_count': user_to_unfollow.followers_count
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+API endpoint benchmarks on a synthetic social graph.
+
+Builds a power-law social graph (see benchmarks/socialgraph.py) in a
+throwaway database, then measures latency, queries per request and
+throughput of the feed, the post list, liking a post and the notification
+list, each called through the full middleware and token authentication
+stack by a rotating set of users. Run from the directory holding
+manage.py:
+
+    python -m benchmarks.endpoints --users 2000 --output endpoints.json
+    python -m benchmarks.endpoints --users 2000 --baseline endpoints.json
+
+With --baseline the run fails (exit status 1) when an endpoint got slower
+than --tolerance allows or issues more queries than before.
+"""
+import argparse
+import itertools
+import json
+import random
+import sys
+
+from benchmarks import harness
+
+BENCHMARKS = ('feed', 'posts_list', 'like', 'notifications')
+
+
+def clients(count, seed):
+    """Authenticated API clients for `count` users spread over the graph."""
+    from django.contrib.auth import get_user_model
+    from rest_framework.test import APIClient
+    from accounts.token_models import AuthToken
+
+    user_ids = list(get_user_model().objects.order_by('pk').values_list('pk', flat=True))
+    chosen = random.Random(seed).sample(user_ids, min(count, len(user_ids)))
+    result = []
+    for user in get_user_model().objects.filter(pk__in=chosen).order_by('pk'):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {AuthToken.objects.create(user=user, device="benchmark").key}')
+        # Warm the token cache so no benchmark pays for the first lookups
+        client.get('/api/auth/profile/')
+        result.append((user, client))
+    return result
+
+
+def like_targets(users, count, seed):
+    """`count` (user, post id) pairs that are not liked yet."""
+    from posts.models import Like, Post
+
+    rng = random.Random(seed)
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    taken = set(Like.objects.filter(user__in=[user for user, _ in users]).values_list('user_id', 'post_id'))
+    pairs = []
+    while len(pairs) < count:
+        user, client = users[len(pairs) % len(users)]
+        post_id = rng.choice(post_ids)
+        if (user.pk, post_id) not in taken:
+            taken.add((user.pk, post_id))
+            pairs.append((client, post_id))
+    return pairs
+
+
+def run(names, iterations, warmup, client_count, seed):
+    users = clients(client_count, seed)
+    likes = like_targets(users, iterations + warmup, seed)
+
+    def get(url):
+        # Every benchmark walks the users in the same order
+        rotation = itertools.cycle(client for _, client in users)
+        return lambda i: next(rotation).get(url)
+
+    def like():
+        pairs = iter(likes)
+
+        def call(i):
+            client, post_id = next(pairs)
+            return client.post(f'/api/posts/{post_id}/like/')
+        return call
+
+    calls = {
+        'feed': lambda: get('/api/feed/'),
+        'posts_list': lambda: get('/api/posts/'),
+        'like': like,
+        'notifications': lambda: get('/api/notifications/'),
+    }
+    # Always in the same order, since earlier runs warm caches for later ones
+    return {name: harness.measure(calls[name](), iterations, warmup) for name in BENCHMARKS if name in names}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--follows-per-user', type=int, default=20, help='Average')
+    parser.add_argument('--posts-per-user', type=int, default=5, help='Average')
+    parser.add_argument('--likes-per-user', type=int, default=20, help='Average')
+    parser.add_argument('--exponent', type=float, default=1.1, help='Power-law exponent of popularity')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--clients', type=int, default=50, help='Distinct users making the requests')
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Compare against the results in this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed latency increase over the baseline, as a fraction')
+    args = parser.parse_args()
+
+    harness.setup()
+    from benchmarks import socialgraph
+
+    spec = socialgraph.GraphSpec(
+        users=args.users, follows_per_user=args.follows_per_user,
+        posts_per_user=args.posts_per_user, likes_per_user=args.likes_per_user,
+        exponent=args.exponent, seed=args.seed,
+    )
+    with harness.isolated_database():
+        sizes = socialgraph.build(spec)
+        results = run(args.only, args.iterations, args.warmup, args.clients, args.seed)
+
+    parameters = {
+        'graph': spec.as_dict(), 'rows': sizes, 'iterations': args.iterations,
+        'warmup': args.warmup, 'clients': args.clients,
+    }
+    if args.output:
+        harness.save_results(args.output, 'endpoints', results, parameters)
+    print(json.dumps({'rows': sizes, 'results': results}, indent=2))
+
+    if args.baseline:
+        regressions = harness.compare(results, harness.load_results(args.baseline), args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
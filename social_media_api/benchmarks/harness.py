@@ -0,0 +1,150 @@
+"""
+Shared plumbing for the benchmark scripts in this package.
+
+Benchmarks run against a throwaway test database (never db.sqlite3), time
+each request and count its queries, and save their results as JSON so two
+runs can be compared.
+"""
+import gc
+import json
+import os
+import platform
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import django
+
+
+def setup():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'social_media_api.settings')
+    django.setup()
+
+
+@contextmanager
+def isolated_database():
+    """Create a fresh test database for the duration of the block."""
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import (
+        override_settings, setup_test_environment, teardown_test_environment,
+    )
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    # Rate limits would turn a benchmark into a measurement of 429s
+    rest_framework = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}
+    try:
+        with override_settings(SECURE_SSL_REDIRECT=False, NOTIFICATIONS_ASYNC=False,
+                               REST_FRAMEWORK=rest_framework):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def percentile(samples, q):
+    """Nearest-rank percentile of `samples` (0 < q <= 100)."""
+    ordered = sorted(samples)
+    index = max(0, -(-len(ordered) * q // 100) - 1)
+    return ordered[int(index)]
+
+
+def measure(call, iterations, warmup=0):
+    """
+    Run `call(i)` `iterations` times and summarise latency and queries.
+
+    `call` must return the response; a non-2xx status aborts the run, since
+    timing error responses would flatter the numbers.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    for i in range(warmup):
+        call(-1 - i)
+
+    latencies = []
+    queries = []
+    # As timeit does, keep garbage collection pauses out of the timings
+    gc.collect()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        for i in range(iterations):
+            with CaptureQueriesContext(connection) as captured:
+                begin = time.perf_counter()
+                response = call(i)
+                latencies.append(time.perf_counter() - begin)
+            if not 200 <= response.status_code < 300:
+                raise RuntimeError(
+                    f'Request {i} failed with {response.status_code}: {response.content[:200]!r}'
+                )
+            queries.append(len(captured))
+        elapsed = time.perf_counter() - started
+    finally:
+        gc.enable()
+
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3),
+        'throughput_rps': round(iterations / elapsed, 1),
+        'queries_per_request': round(statistics.fmean(queries), 2),
+        'max_queries': max(queries),
+    }
+
+
+def environment():
+    from django.conf import settings
+    from django.db import connection
+
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'password_hasher': settings.PASSWORD_HASHERS[0],
+    }
+
+
+def save_results(path, name, results, parameters):
+    payload = {
+        'benchmark': name,
+        'parameters': parameters,
+        'environment': environment(),
+        'results': results,
+    }
+    with open(path, 'w') as handle:
+        json.dump(payload, handle, indent=2)
+        handle.write('\n')
+    return payload
+
+
+def load_results(path):
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def compare(results, baseline, tolerance):
+    """
+    Regressions of `results` against a saved `baseline` run: latencies more
+    than `tolerance` (a fraction) slower, or more queries per request.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None:
+            continue
+        for metric in ('p50_ms', 'p99_ms'):
+            if current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(
+                    f'{name}: {metric} {previous[metric]} -> {current[metric]}'
+                )
+        if current['queries_per_request'] > previous['queries_per_request']:
+            regressions.append(
+                f"{name}: queries_per_request {previous['queries_per_request']} -> "
+                f"{current['queries_per_request']}"
+            )
+    return regressions
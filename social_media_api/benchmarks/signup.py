@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Signup throughput benchmark.
+
+Registers fresh users through POST /api/auth/register/ with each password
+hasher profile and reports latency, queries per signup and signups per
+second. Run from the directory holding manage.py:
+
+    python -m benchmarks.signup --iterations 200 --output signup.json
+"""
+import argparse
+import json
+
+from benchmarks import harness
+
+
+def run(profiles, iterations, warmup):
+    from django.conf import settings
+    from django.test.utils import override_settings
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    results = {}
+    for profile in profiles:
+        hashers = [settings.PASSWORD_HASHER_PROFILES[profile]] + list(settings.PASSWORD_HASHERS)
+
+        def signup(i, profile=profile):
+            return client.post('/api/auth/register/', {
+                'username': f'bench_{profile}_{i}',
+                'email': f'bench_{profile}_{i}@example.com',
+                'password': 'benchmark-pass-123',
+                'bio': 'Benchmark user',
+            }, format='json')
+
+        with override_settings(PASSWORD_HASHERS=hashers):
+            results[profile] = harness.measure(signup, iterations, warmup)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--profiles', nargs='+', default=None,
+                        help='Hasher profiles to compare (default: all configured)')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    harness.setup()
+    from django.conf import settings
+
+    profiles = args.profiles or [
+        profile for profile in settings.PASSWORD_HASHER_PROFILES
+        if profile != 'argon2' or settings.ARGON2_AVAILABLE
+    ]
+    with harness.isolated_database():
+        results = run(profiles, args.iterations, args.warmup)
+
+    parameters = {'iterations': args.iterations, 'warmup': args.warmup, 'profiles': profiles}
+    if args.output:
+        harness.save_results(args.output, 'signup', results, parameters)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+Synthetic social graph for the benchmarks.
+
+Popularity follows a power law: user i is picked as a follow target, post
+author or liked author with weight 1 / (i + 1) ** exponent, so a few users
+have most of the followers, posts and likes, as on a real network. The
+same seed always builds the same graph.
+
+Rows are written with bulk_create, and the data the model signals would
+have maintained (counters, feeds, notifications) is derived afterwards
+through the same code paths the API uses.
+"""
+import itertools
+import random
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+
+from accounts import graph
+from accounts.models import Follow
+from notifications.pipeline import NotificationEvent, write_events
+from posts.bulk import original_timestamps
+from posts.counters import COUNTED_RELATIONS, actual_count
+from posts.feed import rebuild_feed
+from posts.models import Like, Post
+from posts.search import get_backend
+from posts.trending import rebuild_scores
+
+User = get_user_model()
+BATCH_SIZE = 2000
+PASSWORD = 'benchmark-pass-123'
+
+
+@dataclass
+class GraphSpec:
+    users: int = 1000
+    follows_per_user: int = 20
+    posts_per_user: int = 5
+    likes_per_user: int = 20
+    exponent: float = 1.1
+    days: int = 30
+    seed: int = 42
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def _batched(iterable):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, BATCH_SIZE)):
+        yield batch
+
+
+def _popularity(rng, count, exponent):
+    """
+    Power-law weights over `count` items. Returns pick(k, exclude), which
+    draws k distinct indexes, and the cumulative weights for rng.choices.
+    """
+    order = list(range(count))
+    rng.shuffle(order)  # popularity unrelated to signup order
+    weights = [0.0] * count
+    for rank, index in enumerate(order):
+        weights[index] = 1 / (rank + 1) ** exponent
+    cumulative = list(itertools.accumulate(weights))
+
+    def pick(k, exclude=None):
+        k = min(k, count - (1 if exclude is not None else 0))
+        chosen = set()
+        while len(chosen) < k:
+            for index in rng.choices(range(count), cum_weights=cumulative, k=k - len(chosen)):
+                if index != exclude:
+                    chosen.add(index)
+        return chosen
+    return pick, cumulative
+
+
+def build(spec):
+    """Populate the (empty) current database. Returns row counts."""
+    rng = random.Random(spec.seed)
+    now = timezone.now()
+    password = make_password(PASSWORD)  # hashed once, shared by every user
+
+    def moment():
+        return now - timedelta(seconds=rng.uniform(0, spec.days * 86400))
+
+    with original_timestamps():
+        User.objects.bulk_create(
+            [User(username=f'user{i}', email=f'user{i}@example.com', password=password)
+             for i in range(spec.users)],
+            batch_size=BATCH_SIZE,
+        )
+        user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True))
+        pick, user_weights = _popularity(rng, len(user_ids), spec.exponent)
+
+        follows = [
+            (user_ids[i], user_ids[j])
+            for i in range(len(user_ids))
+            for j in pick(rng.randint(0, 2 * spec.follows_per_user), exclude=i)
+        ]
+        for batch in _batched(follows):
+            Follow.objects.bulk_create(
+                [Follow(follower_id=a, followed_id=b, created_at=moment()) for a, b in batch]
+            )
+        graph.recount()
+
+        # Popular users post more
+        total_posts = spec.users * spec.posts_per_user
+        authors = rng.choices(user_ids, cum_weights=user_weights, k=total_posts)
+        for batch in _batched(range(total_posts)):
+            Post.objects.bulk_create([
+                Post(author_id=authors[n], title=f'Post {n}',
+                     content=f'Benchmark post {n} ' + ' '.join(rng.sample(WORDS, 12)),
+                     created_at=(created := moment()), updated_at=created)
+                for n in batch
+            ])
+
+    posts = list(Post.objects.values_list('pk', 'author_id'))
+    post_pick, _ = _popularity(rng, len(posts), spec.exponent)
+    likes = [
+        (user_id, posts[p])
+        for user_id in user_ids
+        for p in post_pick(rng.randint(0, 2 * spec.likes_per_user))
+    ]
+    post_type = ContentType.objects.get_for_model(Post).pk
+    user_type = ContentType.objects.get_for_model(User).pk
+    with original_timestamps():
+        for batch in _batched(likes):
+            with transaction.atomic():
+                Like.objects.bulk_create(
+                    [Like(user_id=u, post_id=pk, created_at=moment()) for u, (pk, _) in batch]
+                )
+                write_events([
+                    NotificationEvent(author, u, 'liked your post', post_type, pk)
+                    for u, (pk, author) in batch if author != u
+                ])
+    for batch in _batched(follows):
+        with transaction.atomic():
+            write_events([NotificationEvent(b, a, 'started following you', user_type, b) for a, b in batch])
+
+    Post.objects.update(**{field: actual_count(field) for field in COUNTED_RELATIONS})
+    for user in User.objects.order_by('pk').iterator(chunk_size=500):
+        rebuild_feed(user)
+    get_backend().rebuild()
+    rebuild_scores()
+
+    return {'users': len(user_ids), 'follows': len(follows), 'posts': len(posts), 'likes': len(likes)}
+
+
+WORDS = (
+    'coffee morning run city music book travel photo food garden code coffee weekend '
+    'friends movie rain summer beach project coffee dinner recipe game team news '
+    'launch idea sunset mountain river train street art design'
+).split()
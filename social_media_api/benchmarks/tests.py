@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from accounts.models import Follow
+from notifications.models import Notification
+from posts.models import FeedEntry, Like, Post
+from . import harness, socialgraph
+
+User = get_user_model()
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, NOTIFICATIONS_ASYNC=False)
+class SocialGraphTestCase(TestCase):
+    def test_builds_a_consistent_skewed_graph(self):
+        spec = socialgraph.GraphSpec(users=60, follows_per_user=5, posts_per_user=2, likes_per_user=4)
+        sizes = socialgraph.build(spec)
+        self.assertEqual(sizes['users'], User.objects.count())
+        self.assertEqual(sizes['follows'], Follow.objects.count())
+        self.assertEqual(sizes['likes'], Like.objects.count())
+
+        followers = sorted(User.objects.values_list('followers_count', flat=True), reverse=True)
+        self.assertEqual(sum(followers), sizes['follows'])
+        # A few users have far more followers than the typical one
+        self.assertGreater(followers[0], 3 * followers[len(followers) // 2])
+
+        post = Post.objects.order_by('-likes_count').first()
+        self.assertEqual(post.likes_count, post.likes.count())
+        self.assertTrue(FeedEntry.objects.exists())
+        self.assertTrue(Notification.objects.filter(verb='liked your post').exists())
+
+    def test_measure_summarises_requests(self):
+        user = User.objects.create_user(username='reader', password='testpass123')
+        client = APIClient()
+        client.force_authenticate(user=user)
+        result = harness.measure(lambda i: client.get('/api/posts/'), iterations=5, warmup=1)
+        self.assertEqual(result['iterations'], 5)
+        self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        self.assertEqual(result['queries_per_request'], result['max_queries'])
+
+        slower = dict(result, p99_ms=result['p99_ms'] * 2, queries_per_request=result['max_queries'] + 1)
+        self.assertEqual(len(harness.compare({'posts': slower}, {'results': {'posts': result}}, 0.5)), 2)
@@ -23,5 +23,5 @@ echo "✅ Deployment preparation complete!"
 echo ""
 echo "Next steps:"
 echo "- Configure environment variables"
-echo "- Start the server: gunicorn social_media_api.wsgi:application"
+echo "- Start the server: gunicorn social_media_api.asgi:application -k uvicorn.workers.UvicornWorker"
 echo "- Or run in development: python manage.py runserver"
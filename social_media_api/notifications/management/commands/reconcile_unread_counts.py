@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+from django.contrib.auth import get_user_model
+from notifications.models import UnreadCounter
+
+
+class Command(BaseCommand):
+    help = 'Recompute cached unread notification counts from the notifications table'
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.annotate(
+            actual=Count('notifications', filter=Q(notifications__is_read=False))
+        ).values_list('pk', 'actual')
+        cached = dict(UnreadCounter.objects.values_list('user_id', 'count'))
+
+        fixed = 0
+        with transaction.atomic():
+            for user_id, actual in users.iterator():
+                if cached.get(user_id, 0) != actual:
+                    UnreadCounter.objects.update_or_create(user_id=user_id, defaults={'count': actual})
+                    fixed += 1
+        self.stdout.write(self.style.SUCCESS(f'Reconciled {fixed} unread counter(s)'))
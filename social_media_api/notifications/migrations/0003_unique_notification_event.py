@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:40
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def remove_duplicates(apps, schema_editor):
+    # Likes used to be notified twice; keep the newest row of each event
+    Notification = apps.get_model('notifications', 'Notification')
+    key = ['recipient', 'actor', 'verb', 'content_type', 'object_id']
+    duplicates = Notification.objects.values(*key).annotate(
+        rows=Count('pk'), keep=Max('pk')
+    ).filter(rows__gt=1)
+    for group in duplicates:
+        Notification.objects.filter(
+            **{field: group[field] for field in key}
+        ).exclude(pk=group['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('notifications', '0002_keyset_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(fields=('recipient', 'actor', 'verb', 'content_type', 'object_id'), name='unique_notification_event'),
+        ),
+    ]
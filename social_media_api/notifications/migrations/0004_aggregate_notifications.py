@@ -0,0 +1,73 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:44
+
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import migrations, models
+
+WINDOW = 24 * 60 * 60
+SAMPLE_ACTORS = 3
+
+
+def fold_existing(apps, schema_editor):
+    """Merge existing per-actor rows into one row per group and window"""
+    Notification = apps.get_model('notifications', 'Notification')
+    groups = {}
+    for notification in Notification.objects.order_by('-timestamp', '-id').iterator():
+        bucket = datetime.fromtimestamp(
+            int(notification.timestamp.timestamp()) // WINDOW * WINDOW, tz=timezone.utc
+        )
+        key = (notification.recipient_id, notification.verb, notification.content_type_id,
+               notification.object_id, bucket)
+        groups.setdefault(key, []).append(notification)
+
+    for key, rows in groups.items():
+        keep = rows[0]
+        actor_ids = list(dict.fromkeys(row.actor_id for row in rows))
+        keep.window_start = key[-1]
+        keep.actor_count = len(actor_ids)
+        keep.sample_actor_ids = actor_ids[:SAMPLE_ACTORS]
+        keep.is_read = all(row.is_read for row in rows)
+        keep.save(update_fields=['window_start', 'actor_count', 'sample_actor_ids', 'is_read'])
+        Notification.objects.filter(pk__in=[row.pk for row in rows[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('notifications', '0003_unique_notification_event'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='notification',
+            name='unique_notification_event',
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='actor_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='sample_actor_ids',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='window_start',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(fold_existing, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='notification',
+            name='window_start',
+            field=models.DateTimeField(),
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(fields=('recipient', 'verb', 'content_type', 'object_id', 'window_start'), name='unique_notification_group'),
+        ),
+    ]
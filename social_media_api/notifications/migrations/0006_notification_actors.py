@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def record_known_actors(apps, schema_editor):
+    """
+    Record the actors existing rows still know about. Older actors of a
+    row are not recoverable; its actor_count keeps counting them.
+    """
+    Notification = apps.get_model('notifications', 'Notification')
+    NotificationActor = apps.get_model('notifications', 'NotificationActor')
+    rows = []
+    for notification in Notification.objects.only('id', 'actor_id', 'sample_actor_ids').iterator():
+        for actor_id in dict.fromkeys([notification.actor_id, *notification.sample_actor_ids]):
+            rows.append(NotificationActor(notification_id=notification.id, actor_id=actor_id))
+    NotificationActor.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_unread_counter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationActor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('actor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('notification', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='actors', to='notifications.notification')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('notification', 'actor'), name='unique_notification_actor')],
+            },
+        ),
+        migrations.RunPython(record_known_actors, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,36 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.contrib.contenttypes.prefetch import GenericPrefetch
+
+
+class NotificationQuerySet(models.QuerySet):
+    def for_api(self):
+        """
+        Load everything NotificationSerializer reads in a fixed number of
+        queries: users are joined in, and targets are fetched with one query
+        per target type (content types come from ContentType's cache).
+        """
+        from posts.models import Post
+        return self.select_related('actor', 'recipient').prefetch_related(
+            GenericPrefetch('target', [
+                Post.objects.only('id', 'title'),
+                get_user_model().objects.only('id', 'username'),
+            ])
+        )
+
 
 class Notification(models.Model):
+    """
+    One row per (recipient, verb, target) per aggregation window.
+
+    Repeated events fold into the row: `actor` is the latest actor,
+    `actor_count` counts distinct actors (each one recorded once as a
+    NotificationActor) and `sample_actor_ids` keeps the few most recent
+    ones for display.
+    """
     recipient = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -18,11 +45,58 @@ class Notification(models.Model):
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
     object_id = models.PositiveIntegerField()
     target = GenericForeignKey('content_type', 'object_id')
+    actor_count = models.PositiveIntegerField(default=1)
+    sample_actor_ids = models.JSONField(default=list)
+    window_start = models.DateTimeField()
     is_read = models.BooleanField(default=False)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    objects = NotificationQuerySet.as_manager()
+
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['recipient', '-timestamp', '-id'], name='notif_recipient_ts_idx'),
+            models.Index(fields=['recipient'], condition=models.Q(is_read=False), name='notif_unread_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipient', 'verb', 'content_type', 'object_id', 'window_start'],
+                name='unique_notification_group',
+            ),
+        ]
+
+    def __str__(self):
+        actor = self.actor.username
+        if self.actor_count > 1:
+            others = self.actor_count - 1
+            actor = f"{actor} and {others} other{'s' if others > 1 else ''}"
+        return f"{actor} {self.verb} for {self.recipient.username}"
+
+
+class NotificationActor(models.Model):
+    """An actor already counted in a notification's actor_count"""
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='actors')
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['notification', 'actor'], name='unique_notification_actor'),
+        ]
+
+    def __str__(self):
+        return f"{self.actor_id} in notification {self.notification_id}"
+
+
+class UnreadCounter(models.Model):
+    """Cached number of unread notifications, maintained by notifications.unread"""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='unread_notification_counter'
+    )
+    count = models.IntegerField(default=0)
 
     def __str__(self):
-        return f"{self.actor.username} {self.verb} for {self.recipient.username}"
\ No newline at end of file
+        return f"{self.user.username}: {self.count} unread"
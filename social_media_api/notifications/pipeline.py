@@ -0,0 +1,216 @@
+"""
+Asynchronous notification delivery.
+
+Signal handlers call notify() with plain ids, so nothing is loaded or written
+inside the user's request. Once the request's transaction commits the event
+is put on an in-process queue, and a background worker thread drains it,
+folding each batch into aggregated notifications ("alice and 12 others
+liked your post"). No external broker is needed.
+
+Set NOTIFICATIONS_ASYNC = False to write on commit in the calling thread
+instead (useful in tests and management commands).
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Notification, NotificationActor
+from . import pubsub, unread
+
+logger = logging.getLogger(__name__)
+
+NotificationEvent = namedtuple(
+    'NotificationEvent', ['recipient_id', 'actor_id', 'verb', 'content_type_id', 'object_id']
+)
+
+
+def window_start(moment):
+    """Start of the aggregation window containing `moment`."""
+    window = getattr(settings, 'NOTIFICATION_AGGREGATION_WINDOW', 24 * 60 * 60)
+    return datetime.fromtimestamp(int(moment.timestamp()) // window * window, tz=dt_timezone.utc)
+
+
+def fold_actor(notification, actor_id):
+    """Make `actor_id` the latest actor of an aggregated notification."""
+    samples = [pk for pk in notification.sample_actor_ids if pk != actor_id]
+    notification.sample_actor_ids = [actor_id] + samples[:getattr(settings, 'NOTIFICATION_SAMPLE_ACTORS', 3) - 1]
+    notification.actor_id = actor_id
+
+
+def write_events(events):
+    """
+    Fold a batch of events into aggregated notifications.
+
+    Events with the same (recipient, verb, target) inside one aggregation
+    window update a single row, which is marked unread again and moved to
+    the top. Each actor is counted once per row, however often they act
+    (retries, like after unlike), through its NotificationActor rows. The
+    batch costs two SELECTs, two bulk INSERTs and one bulk UPDATE (plus the
+    unread counters), however many events it holds.
+    """
+    now = timezone.now()
+    bucket = window_start(now)
+    groups = {}
+    for event in events:
+        key = (event.recipient_id, event.verb, event.content_type_id, event.object_id)
+        groups.setdefault(key, []).append(event.actor_id)
+
+    lookup = Q()
+    for recipient_id, verb, content_type_id, object_id in groups:
+        lookup |= Q(recipient_id=recipient_id, verb=verb, content_type_id=content_type_id, object_id=object_id)
+
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                existing = {
+                    (n.recipient_id, n.verb, n.content_type_id, n.object_id): n
+                    for n in Notification.objects.select_for_update().filter(lookup, window_start=bucket)
+                }
+                # The rows are locked, so actors not recorded yet are exactly
+                # the ones the INSERT below adds
+                counted = set(NotificationActor.objects.filter(
+                    notification__in=[n.pk for n in existing.values()]
+                ).values_list('notification_id', 'actor_id')) if existing else set()
+                to_create, to_update = [], []
+                new_actors = []
+                unread_deltas = {}
+                for key, actor_ids in groups.items():
+                    notification = existing.get(key)
+                    if notification is None or notification.is_read:
+                        # New or resurfaced: one more unread for the recipient
+                        unread_deltas[key[0]] = unread_deltas.get(key[0], 0) + 1
+                    if notification is None:
+                        recipient_id, verb, content_type_id, object_id = key
+                        notification = Notification(
+                            recipient_id=recipient_id, verb=verb, content_type_id=content_type_id,
+                            object_id=object_id, window_start=bucket, actor_count=0,
+                        )
+                        to_create.append(notification)
+                    else:
+                        to_update.append(notification)
+                    for actor_id in actor_ids:
+                        fold_actor(notification, actor_id)
+                    added = {pk for pk in actor_ids if (notification.pk, pk) not in counted}
+                    notification.actor_count += len(added)
+                    new_actors.append((notification, added))
+                    notification.timestamp = now
+                    notification.is_read = False
+
+                Notification.objects.bulk_create(to_create)
+                NotificationActor.objects.bulk_create([
+                    NotificationActor(notification=notification, actor_id=actor_id)
+                    for notification, added in new_actors for actor_id in added
+                ], ignore_conflicts=True)
+                Notification.objects.bulk_update(
+                    to_update, ['actor', 'actor_count', 'sample_actor_ids', 'timestamp', 'is_read']
+                )
+                unread.adjust(unread_deltas)
+                recipient_ids = {key[0] for key in groups}
+                transaction.on_commit(lambda: publish_changes(recipient_ids))
+            return
+        except IntegrityError:
+            # Another process opened the same group first; fold into it
+            if attempt:
+                raise
+
+
+def publish_changes(recipient_ids):
+    """Wake up any open notification streams of these recipients."""
+    broker = pubsub.get_broker()
+    for recipient_id in recipient_ids:
+        broker.publish(pubsub.user_channel(recipient_id), 'changed')
+
+
+class NotificationPipeline:
+    """A queue drained by a single daemon worker thread."""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def submit(self, event):
+        self._ensure_worker()
+        self.queue.put(event)
+
+    def flush(self, timeout=None):
+        """Block until every submitted event has been written."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    def _ensure_worker(self):
+        # Started lazily so forked server workers each get their own thread
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name='notification-pipeline', daemon=True
+                )
+                self._worker.start()
+
+    def _next_batch(self):
+        batch_size = getattr(settings, 'NOTIFICATION_BATCH_SIZE', 100)
+        deadline = time.monotonic() + getattr(settings, 'NOTIFICATION_FLUSH_INTERVAL', 0.5)
+        batch = [self.queue.get()]
+        while len(batch) < batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                close_old_connections()
+                write_events(batch)
+            except Exception:
+                logger.exception('Failed to write %d notification(s)', len(batch))
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+
+pipeline = NotificationPipeline()
+atexit.register(pipeline.flush, timeout=5)
+
+
+def dispatch(event):
+    if getattr(settings, 'NOTIFICATIONS_ASYNC', True):
+        pipeline.submit(event)
+    else:
+        write_events([event])
+
+
+def notify(recipient_id, actor_id, verb, target_model, target_id):
+    """Queue a notification to be written after the current transaction commits."""
+    event = NotificationEvent(
+        recipient_id=recipient_id,
+        actor_id=actor_id,
+        verb=verb,
+        # Served from ContentType's in-process cache after the first lookup
+        content_type_id=ContentType.objects.get_for_model(target_model).pk,
+        object_id=target_id,
+    )
+    transaction.on_commit(lambda: dispatch(event))
@@ -1,12 +1,42 @@
 from rest_framework import serializers
+from django.contrib.contenttypes.models import ContentType
 from .models import Notification
 
+class TargetField(serializers.Field):
+    """Generic target as {type, id, display}; load it with Notification.objects.for_api()"""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        return instance
+
+    def to_representation(self, instance):
+        target = instance.target
+        return {
+            'type': ContentType.objects.get_for_id(instance.content_type_id).model,
+            'id': instance.object_id,
+            'display': str(target) if target is not None else None,
+        }
+
 class NotificationSerializer(serializers.ModelSerializer):
     """Serializer for Notification model"""
     actor_username = serializers.CharField(source='actor.username', read_only=True)
+    target = TargetField()
+    summary = serializers.CharField(source='__str__', read_only=True)
     
     class Meta:
         model = Notification
-        fields = ['id', 'recipient', 'actor', 'actor_username', 'verb', 
-                 'target', 'is_read', 'timestamp']
-        read_only_fields = ['id', 'recipient', 'actor', 'target', 'timestamp']
\ No newline at end of file
+        fields = ['id', 'recipient', 'actor', 'actor_username', 'actor_count',
+                 'sample_actor_ids', 'summary', 'verb', 'target', 'is_read', 'timestamp']
+        read_only_fields = ['id', 'recipient', 'actor', 'actor_count', 'sample_actor_ids',
+                            'target', 'timestamp']
+
+class MarkReadSerializer(serializers.Serializer):
+    """Ids of notifications to mark as read"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000
+    )
@@ -1,42 +1,54 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.contrib.contenttypes.models import ContentType
-from posts.models import Like, Comment
-from accounts.models import CustomUser
-from .models import Notification
+from django.contrib.auth import get_user_model
+from posts.models import Like, Comment, Post
+from posts.signals import likes_added
+from accounts.models import Follow
+from .pipeline import notify
+
+User = get_user_model()
+
+# Handlers only queue events (see pipeline.py); the notification rows are
+# written by a background worker after the request's transaction commits.
 
 @receiver(post_save, sender=Like)
 def create_like_notification(sender, instance, created, **kwargs):
     """Create notification when someone likes a post"""
     if created:
         # Don't notify if user likes their own post
-        if instance.user != instance.post.author:
-            content_type = ContentType.objects.get_for_model(instance.post)
-            
-            Notification.objects.create(
-                recipient=instance.post.author,
-                actor=instance.user,
+        if instance.user_id != instance.post.author_id:
+            notify(
+                recipient_id=instance.post.author_id,
+                actor_id=instance.user_id,
                 verb='liked your post',
-                content_type=content_type,
-                object_id=instance.post.id
+                target_model=Post,
+                target_id=instance.post_id
             )
 
-@receiver(post_save, sender=CustomUser.following.through)
+@receiver(likes_added, sender=Like)
+def create_batch_like_notifications(sender, user, posts, **kwargs):
+    """Create notifications for likes written in a batch"""
+    for post_id, author_id in posts:
+        if user.pk != author_id:
+            notify(
+                recipient_id=author_id,
+                actor_id=user.pk,
+                verb='liked your post',
+                target_model=Post,
+                target_id=post_id
+            )
+
+@receiver(post_save, sender=Follow)
 def create_follow_notification(sender, instance, created, **kwargs):
     """Create notification when someone follows a user"""
     if created:
         # instance is the follow relationship
-        from_user = instance.from_user
-        to_user = instance.to_user
-        
-        content_type = ContentType.objects.get_for_model(to_user)
-        
-        Notification.objects.create(
-            recipient=to_user,
-            actor=from_user,
+        notify(
+            recipient_id=instance.followed_id,
+            actor_id=instance.follower_id,
             verb='started following you',
-            content_type=content_type,
-            object_id=to_user.id
+            target_model=User,
+            target_id=instance.followed_id
         )
 
 @receiver(post_save, sender=Comment)
@@ -44,13 +56,20 @@ def create_comment_notification(sender, instance, created, **kwargs):
     """Create notification when someone comments on a post"""
     if created:
         # Don't notify if user comments on their own post
-        if instance.author != instance.post.author:
-            content_type = ContentType.objects.get_for_model(instance.post)
-            
-            Notification.objects.create(
-                recipient=instance.post.author,
-                actor=instance.author,
+        if instance.author_id != instance.post.author_id:
+            notify(
+                recipient_id=instance.post.author_id,
+                actor_id=instance.author_id,
                 verb='commented on your post',
-                content_type=content_type,
-                object_id=instance.post.id
-            )
\ No newline at end of file
+                target_model=Post,
+                target_id=instance.post_id
+            )
+        # ...and the parent comment's author when it is a reply
+        if instance.parent_id and instance.author_id != instance.parent.author_id:
+            notify(
+                recipient_id=instance.parent.author_id,
+                actor_id=instance.author_id,
+                verb='replied to your comment',
+                target_model=Post,
+                target_id=instance.post_id
+            )
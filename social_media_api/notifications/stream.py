@@ -0,0 +1,112 @@
+"""
+Server-sent events for notifications.
+
+An open stream waits on the recipient's pubsub channel and only queries the
+database when the notification pipeline reports a change, so an idle client
+costs one connection instead of a poll every few seconds.
+
+Each event id is "<timestamp in microseconds>-<notification id>", which is
+also the keyset the stream resumes from when a client reconnects with
+Last-Event-ID. Aggregated notifications move forward when they are updated,
+so a notification that gains actors is sent again.
+"""
+import asyncio
+import json
+from datetime import datetime, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .models import Notification
+from .serializers import NotificationSerializer
+from . import pubsub
+
+BATCH_SIZE = 100
+
+
+def encode_event_id(notification):
+    moment = notification.timestamp
+    micros = int(moment.timestamp()) * 1_000_000 + moment.microsecond
+    return f'{micros}-{notification.pk}'
+
+
+def decode_event_id(value):
+    """Return the (timestamp, id) position of an event id, or None if invalid."""
+    try:
+        micros, pk = (int(part) for part in value.split('-'))
+    except (AttributeError, ValueError):
+        return None
+    seconds, micro = divmod(micros, 1_000_000)
+    try:
+        moment = datetime.fromtimestamp(seconds, tz=dt_timezone.utc).replace(microsecond=micro)
+    except (OverflowError, OSError, ValueError):
+        return None
+    return moment, pk
+
+
+def authenticate(request):
+    """Run the API's authentication classes against a plain Django request."""
+    drf_request = Request(
+        request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    )
+    try:
+        user = drf_request.user
+    except exceptions.APIException:
+        return None
+    return user if user.is_authenticated else None
+
+
+def fetch_after(user, position):
+    """Serialized notifications after `position`, oldest first."""
+    moment, pk = position
+    notifications = list(
+        Notification.objects.for_api()
+        .filter(recipient=user)
+        .filter(Q(timestamp__gt=moment) | Q(timestamp=moment, id__gt=pk))
+        .order_by('timestamp', 'id')[:BATCH_SIZE]
+    )
+    return [
+        (encode_event_id(n), data)
+        for n, data in zip(notifications, NotificationSerializer(notifications, many=True).data)
+    ]
+
+
+def format_event(event_id, data):
+    return f'id: {event_id}\nevent: notification\ndata: {json.dumps(data)}\n\n'
+
+
+async def event_stream(user, position):
+    heartbeat = getattr(settings, 'NOTIFICATION_STREAM_HEARTBEAT', 15)
+    subscription = pubsub.get_broker().subscribe(pubsub.user_channel(user.pk))
+    try:
+        # Browsers wait this long (ms) before reconnecting
+        yield 'retry: 5000\n\n'
+        while True:
+            # Subscribed before the first query, so nothing written in
+            # between can be missed
+            while True:
+                events = await sync_to_async(fetch_after)(user, position)
+                for event_id, data in events:
+                    yield format_event(event_id, data)
+                if events:
+                    position = decode_event_id(events[-1][0])
+                if len(events) < BATCH_SIZE:
+                    break
+            try:
+                await asyncio.wait_for(subscription.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+    finally:
+        subscription.close()
+
+
+def start_position(request):
+    """Resume after Last-Event-ID, or start from now for a fresh connection."""
+    value = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    position = decode_event_id(value) if value else None
+    return position or (timezone.now(), 0)
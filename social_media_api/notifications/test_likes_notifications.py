@@ -11,7 +11,7 @@ from posts.models import Post, Like
 from notifications.models import Notification
 from django.contrib.contenttypes.models import ContentType
 from rest_framework.test import APIClient
-from rest_framework.authtoken.models import Token
+from accounts.token_models import AuthToken as Token
 
 User = get_user_model()
 
@@ -111,8 +111,8 @@ def test_notification_functionality(user1, user2, post):
     client1 = APIClient()
     client2 = APIClient()
     
-    token1 = Token.objects.get(user=user1)
-    token2 = Token.objects.get(user=user2)
+    token1 = Token.objects.create(user=user1)
+    token2 = Token.objects.create(user=user2)
     
     client1.credentials(HTTP_AUTHORIZATION='Token ' + token1.key)
     client2.credentials(HTTP_AUTHORIZATION='Token ' + token2.key)
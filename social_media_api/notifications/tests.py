@@ -1,3 +1,352 @@
-from django.test import TestCase
+import asyncio
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from accounts.token_models import AuthToken as Token
+from rest_framework.test import APIClient
+from posts import likes
+from posts.models import Post, Like, Comment
+from accounts import graph
+from .models import Notification
+from .pipeline import NotificationEvent, pipeline, write_events
+from .stream import encode_event_id
+from social_media_api.query_budget import QueryBudgetMixin
+
+User = get_user_model()
+
+
+@override_settings(NOTIFICATIONS_ASYNC=False)
+class NotificationSignalsTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.fan = User.objects.create_user(username='fan', password='testpass123')
+        self.post = Post.objects.create(title='Hello', content='...', author=self.author)
+
+    def test_events_are_written_only_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            Like.objects.create(user=self.fan, post=self.post)
+        self.assertFalse(Notification.objects.exists())
+
+        for callback in callbacks:
+            callback()
+        notification = Notification.objects.get()
+        self.assertEqual(
+            (notification.recipient, notification.actor, notification.verb, notification.target),
+            (self.author, self.fan, 'liked your post', self.post),
+        )
+
+    def test_comment_and_follow_notifications(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(post=self.post, author=self.fan, content='Nice')
+            graph.follow(self.fan, self.author)
+        self.assertEqual(
+            sorted(Notification.objects.values_list('verb', flat=True)),
+            ['commented on your post', 'started following you'],
+        )
+
+    def test_reply_notifies_the_parent_author(self):
+        friend = User.objects.create_user(username='friend', password='testpass123')
+        with self.captureOnCommitCallbacks(execute=True):
+            comment = Comment.objects.create(post=self.post, author=self.fan, content='Nice')
+            Comment.objects.create(post=self.post, author=friend, content='Agreed', parent=comment)
+            # Replying to yourself notifies only the post author
+            Comment.objects.create(post=self.post, author=self.fan, content='Thanks', parent=comment)
+        self.assertEqual(
+            sorted(Notification.objects.values_list('recipient__username', 'verb')),
+            [('author', 'commented on your post'), ('fan', 'replied to your comment')],
+        )
+
+    def test_no_notification_for_own_post(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Like.objects.create(user=self.author, post=self.post)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_batch_likes_notify_post_authors(self):
+        own_post = Post.objects.create(title='Mine', content='...', author=self.fan)
+        with self.captureOnCommitCallbacks(execute=True):
+            likes.like_many(self.fan, [self.post.id, own_post.id])
+        notification = Notification.objects.get()
+        self.assertEqual((notification.recipient, notification.target), (self.author, self.post))
+
+
+@override_settings(NOTIFICATIONS_ASYNC=True, NOTIFICATION_FLUSH_INTERVAL=0.01)
+class NotificationPipelineTestCase(TransactionTestCase):
+    def test_worker_writes_batches_off_the_request_thread(self):
+        author = User.objects.create_user(username='author', password='testpass123')
+        post = Post.objects.create(title='Hello', content='...', author=author)
+        # One transaction, so the events are queued together at commit and
+        # this thread is done writing before the worker starts (SQLite's
+        # shared in-memory test database does not wait on table locks)
+        with transaction.atomic():
+            for i in range(5):
+                fan = User.objects.create_user(username=f'fan{i}', password='testpass123')
+                Like.objects.create(user=fan, post=post)
+
+        self.assertTrue(pipeline.flush(timeout=5))
+        self.assertEqual(Notification.objects.get(recipient=author).actor_count, 5)
+
+
+@override_settings(NOTIFICATIONS_ASYNC=False, SECURE_SSL_REDIRECT=False)
+class NotificationIdempotencyTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.fan = User.objects.create_user(username='fan', password='testpass123')
+        self.post = Post.objects.create(title='Hello', content='...', author=self.author)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.fan)
+
+    def test_like_endpoint_notifies_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/posts/{self.post.id}/like/')
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def test_repeated_event_upserts_single_row(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/posts/{self.post.id}/like/')
+        Notification.objects.update(is_read=True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/posts/{self.post.id}/unlike/')
+            self.client.post(f'/api/posts/{self.post.id}/like/')
+
+        notification = Notification.objects.get()
+        self.assertFalse(notification.is_read)
+
+    def test_duplicates_in_one_batch_collapse(self):
+        event = NotificationEvent(
+            recipient_id=self.author.id,
+            actor_id=self.fan.id,
+            verb='liked your post',
+            content_type_id=ContentType.objects.get_for_model(Post).id,
+            object_id=self.post.id,
+        )
+        write_events([event, event])
+        write_events([event])
+        self.assertEqual(Notification.objects.count(), 1)
+
+
+@override_settings(NOTIFICATIONS_ASYNC=False, NOTIFICATION_SAMPLE_ACTORS=2)
+class NotificationAggregationTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.post = Post.objects.create(title='Viral', content='...', author=self.author)
+        self.other_post = Post.objects.create(title='Quiet', content='...', author=self.author)
+        self.fans = [
+            User.objects.create_user(username=f'fan{i}', password='testpass123')
+            for i in range(4)
+        ]
+
+    def test_likes_on_one_post_fold_into_one_row(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for fan in self.fans:
+                Like.objects.create(user=fan, post=self.post)
+            Like.objects.create(user=self.fans[0], post=self.other_post)
+
+        viral = Notification.objects.get(object_id=self.post.id)
+        self.assertEqual(viral.actor, self.fans[3])
+        self.assertEqual(viral.actor_count, 4)
+        self.assertEqual(viral.sample_actor_ids, [self.fans[3].id, self.fans[2].id])
+        self.assertEqual(str(viral), 'fan3 and 3 others liked your post for author')
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_returning_actors_are_not_counted_twice(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for fan in self.fans:
+                Like.objects.create(user=fan, post=self.post)
+        # fans[0] has dropped out of the two sampled actors by now
+        with self.captureOnCommitCallbacks(execute=True):
+            Like.objects.filter(user=self.fans[0], post=self.post).delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            Like.objects.create(user=self.fans[0], post=self.post)
+
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor_count, 4)
+        self.assertEqual(notification.sample_actor_ids, [self.fans[0].id, self.fans[3].id])
+        self.assertEqual(notification.actors.count(), 4)
+
+    def test_events_across_batches_fold_and_resurface(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Like.objects.create(user=self.fans[0], post=self.post)
+        Notification.objects.update(is_read=True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Like.objects.create(user=self.fans[1], post=self.post)
+
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor_count, 2)
+        self.assertFalse(notification.is_read)
+
+
+@override_settings(NOTIFICATIONS_ASYNC=False, SECURE_SSL_REDIRECT=False)
+class UnreadNotificationsTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.fan = User.objects.create_user(username='fan', password='testpass123')
+        self.posts = [
+            Post.objects.create(title=f'Post {i}', content='...', author=self.author)
+            for i in range(3)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            for post in self.posts:
+                Like.objects.create(user=self.fan, post=post)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.author)
+
+    def unread_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/notifications/unread-count/')
+        self.assertFalse(any('notifications_notification' in q['sql'] for q in queries.captured_queries))
+        return response.data['unread_count']
+
+    def test_counter_tracks_new_and_resurfaced_notifications(self):
+        self.assertEqual(self.unread_count(), 3)
+
+        self.client.post('/api/notifications/mark-all-read/')
+        self.assertEqual(self.unread_count(), 0)
+
+        other = User.objects.create_user(username='other', password='testpass123')
+        with self.captureOnCommitCallbacks(execute=True):
+            Like.objects.create(user=other, post=self.posts[0])
+        self.assertEqual(self.unread_count(), 1)
+
+    def test_bulk_mark_read_uses_one_update(self):
+        ids = list(Notification.objects.values_list('id', flat=True)[:2])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/notifications/mark-read/', {'ids': ids}, format='json')
+        self.assertEqual(response.data, {'marked_read': 2, 'unread_count': 1})
+        updates = [q for q in queries.captured_queries
+                   if q['sql'].startswith('UPDATE "notifications_notification"')]
+        self.assertEqual(len(updates), 1)
+
+    def test_cannot_mark_other_users_notifications(self):
+        self.client.force_authenticate(user=self.fan)
+        ids = list(Notification.objects.values_list('id', flat=True))
+        response = self.client.post('/api/notifications/mark-read/', {'ids': ids}, format='json')
+        self.assertEqual(response.data['marked_read'], 0)
+        self.assertEqual(Notification.objects.filter(is_read=False).count(), 3)
+
+    def test_single_mark_read_decrements_counter(self):
+        notification = Notification.objects.first()
+        response = self.client.patch(f'/api/notifications/{notification.id}/mark-read/')
+        self.assertTrue(response.data['is_read'])
+        self.assertEqual(self.unread_count(), 2)
+
+
+@override_settings(NOTIFICATIONS_ASYNC=False, SECURE_SSL_REDIRECT=False)
+class NotificationListTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(6):
+                fan = User.objects.create_user(username=f'fan{i}', password='testpass123')
+                post = Post.objects.create(title=f'Post {i}', content='...', author=self.author)
+                Like.objects.create(user=fan, post=post)
+                graph.follow(fan, self.author)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.author)
+
+    def test_targets_are_serialized(self):
+        response = self.client.get('/api/notifications/')
+        targets = {item['target']['type'] for item in response.data['results']}
+        self.assertEqual(targets, {'post', 'customuser'})
+        follow = next(item for item in response.data['results'] if item['target']['type'] == 'customuser')
+        self.assertEqual(follow['target'], {'type': 'customuser', 'id': self.author.id, 'display': 'author'})
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        # Warm ContentType's cache so both requests start from the same state
+        self.client.get('/api/notifications/?page_size=1')
+        counts = []
+        for page_size in (2, 7):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(f'/api/notifications/?page_size={page_size}')
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+@override_settings(NOTIFICATIONS_ASYNC=False, SECURE_SSL_REDIRECT=False)
+class NotificationStreamTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.fan = User.objects.create_user(username='fan', password='testpass123')
+        self.posts = [
+            Post.objects.create(title=f'Post {i}', content='...', author=self.author)
+            for i in range(3)
+        ]
+        for post in self.posts[:2]:
+            self.like(post)
+        self.token = Token.objects.create(user=self.author)
+
+    def like(self, post):
+        with self.captureOnCommitCallbacks(execute=True):
+            Like.objects.create(user=self.fan, post=post)
+
+    async def next_chunk(self, content):
+        chunk = await asyncio.wait_for(anext(content), timeout=5)
+        return chunk.decode()
+
+    async def test_resumes_after_last_event_id_and_pushes_new_notifications(self):
+        first, second = await sync_to_async(list)(Notification.objects.order_by('timestamp', 'id'))
+        response = await self.async_client.get(
+            '/api/notifications/stream/',
+            headers={'Authorization': f'Token {self.token.key}', 'Last-Event-ID': encode_event_id(first)},
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = response.streaming_content
+        try:
+            self.assertTrue((await self.next_chunk(content)).startswith('retry:'))
+            event = await self.next_chunk(content)
+            self.assertIn(f'id: {encode_event_id(second)}\n', event)
+            self.assertIn(f'"target": {{"type": "post", "id": {self.posts[1].id}', event)
+
+            # Written after the stream went idle: delivered through the broker
+            await sync_to_async(self.like)(self.posts[2])
+            event = await self.next_chunk(content)
+            self.assertIn(f'"target": {{"type": "post", "id": {self.posts[2].id}', event)
+        finally:
+            await content.aclose()
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get('/api/notifications/stream/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_refused_under_wsgi(self):
+        client = APIClient()
+        client.force_authenticate(user=self.author)
+        response = client.get('/api/notifications/stream/')
+        self.assertEqual(response.status_code, 501)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, NOTIFICATIONS_ASYNC=False)
+class NotificationQueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.recipient = User.objects.create_user(username='recipient', password='testpass123')
+        # Notifications are written on commit; run those hooks here
+        with self.captureOnCommitCallbacks(execute=True):
+            posts = [Post.objects.create(author=self.recipient, title=f'Post {i}', content='Body') for i in range(2)]
+            for i in range(4):
+                actor = User.objects.create_user(username=f'actor{i}', password='testpass123')
+                graph.follow(actor, self.recipient)
+                for post in posts:
+                    Like.objects.create(user=actor, post=post)
+                    Comment.objects.create(post=post, author=actor, content='Hi')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.recipient)
+
+    def test_list_and_unread_count(self):
+        with self.assertWithinBudget('notifications-list'):
+            response = self.client.get('/api/notifications/')
+        self.assertEqual(response.status_code, 200)
+        # Likes and comments on two posts, and follows: both target types
+        self.assertEqual(len(response.data['results']), 5)
+        with self.assertWithinBudget('notifications-unread-count'):
+            response = self.client.get('/api/notifications/unread-count/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['unread_count'], 5)
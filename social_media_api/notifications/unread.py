@@ -0,0 +1,44 @@
+"""
+Per-user unread notification counters.
+
+The count lives in UnreadCounter and moves in the same transaction as the
+notifications it describes, so reading it never touches the notifications
+table. `manage.py reconcile_unread_counts` repairs any drift.
+"""
+from django.db import transaction
+from django.db.models import F
+
+from .models import Notification, UnreadCounter
+
+
+def unread_count(user):
+    return UnreadCounter.objects.filter(pk=user.pk).values_list('count', flat=True).first() or 0
+
+
+def adjust(deltas):
+    """Apply {user_id: delta} to the counters, grouping users by delta."""
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    UnreadCounter.objects.bulk_create(
+        [UnreadCounter(user_id=user_id) for user_id in deltas], ignore_conflicts=True
+    )
+    by_delta = {}
+    for user_id, delta in deltas.items():
+        by_delta.setdefault(delta, []).append(user_id)
+    for delta, user_ids in by_delta.items():
+        UnreadCounter.objects.filter(pk__in=user_ids).update(count=F('count') + delta)
+
+
+def mark_read(user, ids=None):
+    """
+    Mark `user`'s notifications read with a single UPDATE: all of them, or
+    only those in `ids`. Returns how many changed.
+    """
+    unread = Notification.objects.filter(recipient=user, is_read=False)
+    if ids is not None:
+        unread = unread.filter(pk__in=ids)
+    with transaction.atomic():
+        marked = unread.update(is_read=True)
+        adjust({user.pk: -marked})
+    return marked
@@ -4,4 +4,8 @@ from . import views
 urlpatterns = [
     path('', views.NotificationListView.as_view(), name='notification-list'),
     path('<int:pk>/mark-read/', views.MarkNotificationAsReadView.as_view(), name='mark-notification-read'),
+    path('unread-count/', views.UnreadCountView.as_view(), name='notification-unread-count'),
+    path('mark-read/', views.BulkMarkAsReadView.as_view(), name='mark-notifications-read'),
+    path('stream/', views.notification_stream, name='notification-stream'),
+    path('mark-all-read/', views.MarkAllAsReadView.as_view(), name='mark-all-notifications-read'),
 ]
@@ -1,16 +1,28 @@
-from rest_framework import generics, permissions
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework import generics, permissions, status
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from .models import Notification
-from .serializers import NotificationSerializer
+from .serializers import NotificationSerializer, MarkReadSerializer
+from . import stream, unread
+from social_media_api.pagination import KeysetPagination
+
+
+class NotificationPagination(KeysetPagination):
+    ordering_field = 'timestamp'
+
 
 class NotificationListView(generics.ListAPIView):
     """View to list all notifications for the current user"""
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NotificationPagination
     
     def get_queryset(self):
         # Return notifications for the current user, newest first
-        return Notification.objects.filter(
+        return Notification.objects.for_api().filter(
             recipient=self.request.user
         ).order_by('-timestamp')
 
@@ -18,20 +30,80 @@ class MarkNotificationAsReadView(generics.UpdateAPIView):
     """View to mark a notification as read"""
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
-    queryset = Notification.objects.all()
+    queryset = Notification.objects.for_api()
     
     def update(self, request, *args, **kwargs):
         notification = self.get_object()
         
         # Check if the notification belongs to the current user
-        if notification.recipient != request.user:
+        if notification.recipient_id != request.user.id:
             return Response(
                 {'error': 'You do not have permission to mark this notification as read'},
                 status=403
             )
         
+        # Single UPDATE that also keeps the unread counter in step
+        unread.mark_read(request.user, ids=[notification.pk])
         notification.is_read = True
-        notification.save()
         
         serializer = self.get_serializer(notification)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+class UnreadCountView(APIView):
+    """View to get the current user's unread notification count"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        # Served from the cached counter, never from the notifications table
+        return Response({'unread_count': unread.unread_count(request.user)})
+
+class BulkMarkAsReadView(APIView):
+    """View to mark several notifications as read in one request"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = MarkReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        marked = unread.mark_read(request.user, ids=serializer.validated_data['ids'])
+        return Response({
+            'marked_read': marked,
+            'unread_count': unread.unread_count(request.user)
+        }, status=status.HTTP_200_OK)
+
+class MarkAllAsReadView(APIView):
+    """View to mark all of the current user's notifications as read"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        marked = unread.mark_read(request.user)
+        return Response({
+            'marked_read': marked,
+            'unread_count': unread.unread_count(request.user)
+        }, status=status.HTTP_200_OK)
+
+async def notification_stream(request):
+    """Stream the current user's new notifications as server-sent events"""
+    if not isinstance(request, ASGIRequest):
+        # A WSGI server would buffer the endless response forever
+        return JsonResponse(
+            {'detail': 'The notification stream is only available when served over ASGI.'},
+            status=501
+        )
+    if request.method != 'GET':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+
+    user = await sync_to_async(stream.authenticate)(request)
+    if user is None:
+        return JsonResponse(
+            {'detail': 'Authentication credentials were not provided.'},
+            status=401
+        )
+
+    response = StreamingHttpResponse(
+        stream.event_stream(user, stream.start_position(request)),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
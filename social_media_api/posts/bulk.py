@@ -0,0 +1,172 @@
+"""
+NDJSON export and import of users, follows, posts, comments and likes.
+
+Each line is one row as a JSON object tagged with its "type". Types are
+written in dependency order (users before the follows and posts that
+refer to them, and so on), and comments by id so a reply always follows
+its parent, so an import can insert every batch as soon as it is read and
+holds at most one batch in memory. Primary keys are kept, which keeps the
+references valid without an id map; rows whose key (or unique fields)
+already exist are skipped, so an interrupted import can simply be run
+again. An existing user, post or comment that holds an imported key (or
+username) but is not the same row stops the import instead, since the
+rows referring to it would be attached to the wrong owner.
+
+Rows are inserted with bulk_create, which sends no model signals: no
+notifications, feed fan-out, search indexing or counter updates happen
+during an import. Rebuild the derived data afterwards (import_social does
+this unless told not to). API tokens, notifications and feeds are not
+exported.
+"""
+import datetime
+import json
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+
+from accounts.models import Follow
+from .models import Comment, Like, Post
+
+User = get_user_model()
+
+# type -> (model, exported fields), in dependency order
+KINDS = {
+    'user': (User, [
+        'id', 'username', 'email', 'password', 'first_name', 'last_name', 'bio',
+        'profile_picture', 'is_active', 'is_staff', 'is_superuser', 'date_joined', 'last_login',
+    ]),
+    'follow': (Follow, ['follower_id', 'followed_id', 'created_at']),
+    'post': (Post, ['id', 'author_id', 'title', 'content', 'created_at', 'updated_at']),
+    'comment': (Comment, [
+        'id', 'post_id', 'author_id', 'parent_id', 'content', 'path', 'depth', 'created_at', 'updated_at',
+    ]),
+    'like': (Like, ['user_id', 'post_id', 'created_at']),
+}
+
+
+# Fields an existing row must share with an imported row of the same key
+# to count as the same row (a re-run), rather than a clash
+IDENTITY = {
+    'user': ['username'],
+    'post': ['author_id'],
+    'comment': ['post_id', 'author_id'],
+}
+
+
+class RowEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder cuts datetimes to milliseconds, which would
+        # reorder rows that keyset pagination tells apart by microsecond
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def export_rows(stream, batch_size=2000, kinds=None):
+    """Write every row as NDJSON to `stream`. Returns {type: rows written}."""
+    counts = {}
+    for kind, (model, fields) in KINDS.items():
+        if kinds and kind not in kinds:
+            continue
+        counts[kind] = 0
+        rows = model.objects.order_by('pk').values(*fields).iterator(chunk_size=batch_size)
+        for row in rows:
+            stream.write(json.dumps({'type': kind, **row}, cls=RowEncoder))
+            stream.write('\n')
+            counts[kind] += 1
+    return counts
+
+
+@contextmanager
+def original_timestamps():
+    """Keep the imported created_at/updated_at instead of stamping them now."""
+    switched = []
+    for model, _ in KINDS.values():
+        for field in model._meta.concrete_fields:
+            for flag in ('auto_now', 'auto_now_add'):
+                if getattr(field, flag, False):
+                    setattr(field, flag, False)
+                    switched.append((field, flag))
+    try:
+        yield
+    finally:
+        for field, flag in switched:
+            setattr(field, flag, True)
+
+
+def import_rows(stream, batch_size=2000):
+    """
+    Load NDJSON rows from `stream`, one transaction per batch.
+    Returns {type: rows read}; skipped duplicates are included.
+    """
+    counts = {kind: 0 for kind in KINDS}
+    batch, batch_kind = [], None
+
+    def flush():
+        if batch:
+            model = KINDS[batch_kind][0]
+            check_clashes(batch_kind, batch)
+            try:
+                with transaction.atomic():
+                    model.objects.bulk_create(batch, batch_size=batch_size, ignore_conflicts=True)
+            except IntegrityError as exc:
+                # e.g. a post whose author is neither in the file nor here
+                raise ValueError(f'A batch of {batch_kind} rows refers to rows that do not exist ({exc})')
+            batch.clear()
+
+    with original_timestamps():
+        for number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+                kind = row.pop('type')
+                model, fields = KINDS[kind]
+            except (ValueError, KeyError):
+                raise ValueError(f'Line {number}: not a row of a known type')
+            unknown = set(row) - set(fields)
+            if unknown:
+                raise ValueError(f'Line {number}: unknown {kind} field(s) {sorted(unknown)}')
+
+            if kind != batch_kind or len(batch) >= batch_size:
+                flush()
+                batch_kind = kind
+            batch.append(model(**row))
+            counts[kind] += 1
+        flush()
+
+    _reset_sequences()
+    return counts
+
+
+def check_clashes(kind, batch):
+    """Raise ValueError if existing rows hold the keys of `batch` but are other rows."""
+    fields = IDENTITY.get(kind)
+    if not fields:
+        # Follows and likes are identified by their unique pair alone
+        return
+    model = KINDS[kind][0]
+    incoming = {obj.pk: tuple(getattr(obj, field) for field in fields) for obj in batch}
+    lookup = Q(pk__in=incoming)
+    if kind == 'user':
+        lookup |= Q(username__in=[obj.username for obj in batch])
+    for pk, *existing in model.objects.filter(lookup).values_list('pk', *fields):
+        if incoming.get(pk) != tuple(existing):
+            raise ValueError(
+                f'{kind} {pk} ({", ".join(map(str, existing))}) already exists and is not the '
+                f'imported {kind}; import into an empty database or one this data came from'
+            )
+
+
+def _reset_sequences():
+    # Explicit primary keys leave PostgreSQL sequences behind; no-op on SQLite
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), [model for model, _ in KINDS.values()]
+    )
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
@@ -0,0 +1,54 @@
+"""
+Denormalized like/comment counters on Post, and reply counters on Comment.
+
+Counters are changed with a single F-expression UPDATE in the same
+transaction as the Like/Comment write, so they never need a read. Use
+`manage.py reconcile_counters` to repair any drift.
+"""
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from social_media_api import response_cache
+from .models import Comment, Like, Post
+
+COUNTED_RELATIONS = {
+    'likes_count': Like,
+    'comments_count': Comment,
+}
+
+
+def adjust(post_ids, field, delta):
+    """Add `delta` to `field` on every post in `post_ids`."""
+    Post.objects.filter(pk__in=post_ids).update(
+        **{field: Greatest(F(field) + delta, Value(0))}
+    )
+    invalidate_posts(post_ids)
+
+
+def adjust_replies(comment_ids, delta):
+    """Add `delta` to the reply_count of every comment in `comment_ids`."""
+    Comment.objects.filter(pk__in=comment_ids).update(
+        reply_count=Greatest(F('reply_count') + delta, Value(0))
+    )
+
+
+def invalidate_posts(post_ids):
+    """Expire cached responses of posts whose counters changed."""
+    response_cache.invalidate(*[response_cache.object_key(Post, pk) for pk in post_ids])
+
+
+def actual_count(field):
+    """Subquery yielding the true value of `field` for the outer post."""
+    model = COUNTED_RELATIONS[field]
+    counts = model.objects.filter(post=OuterRef('pk')).order_by().values('post').annotate(
+        total=Count('pk')
+    ).values('total')
+    return Coalesce(Subquery(counts), Value(0))
+
+
+def actual_reply_count():
+    """Subquery yielding the true number of direct replies to the outer comment."""
+    counts = Comment.objects.filter(parent=OuterRef('pk')).order_by().values('parent').annotate(
+        total=Count('pk')
+    ).values('total')
+    return Coalesce(Subquery(counts), Value(0))
@@ -0,0 +1,126 @@
+"""
+Materialized home feeds.
+
+New posts are pushed into each follower's FeedEntry rows when they are
+created (fan-out-on-write), so a feed page is a single range scan on
+(user, created_at, post_id). Authors with more than FEED_FANOUT_THRESHOLD
+followers are skipped on write and their posts are pulled at read time
+instead (fan-out-on-read), which keeps a single post from writing thousands
+of rows.
+
+Feeds are trimmed to the newest FEED_MAX_LENGTH entries by `manage.py
+trim_feeds`, run periodically, rather than on every new post: ranking the
+entries of a thousand full feeds does not belong in a request.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+
+from accounts.models import Follow
+from .models import FeedEntry, Post
+
+User = get_user_model()
+
+
+def max_length():
+    return getattr(settings, 'FEED_MAX_LENGTH', 500)
+
+
+def fanout_threshold():
+    return getattr(settings, 'FEED_FANOUT_THRESHOLD', 1000)
+
+
+def popular_author_ids(authors):
+    """Return the ids of `authors` whose posts are pulled at read time."""
+    return authors.filter(followers_count__gt=fanout_threshold()).values_list('pk', flat=True)
+
+
+def get_feed_queryset(user):
+    """`user`'s materialized feed entries with their posts, newest first."""
+    return FeedEntry.objects.filter(user=user).for_api(user).order_by('-created_at', '-post_id')
+
+
+def get_pulled_queryset(user):
+    """Posts of the popular authors `user` follows, or None if there are none."""
+    popular = list(popular_author_ids(user.following.all()))
+    if not popular:
+        return None
+    return Post.objects.filter(author__in=popular).for_api(user).order_by('-created_at', '-id')
+
+
+def entry_posts(entries):
+    """The posts of feed `entries`, carrying the viewer flags annotated on the entries."""
+    posts = []
+    for entry in entries:
+        post = entry.post
+        for flag in ('liked_by_me', 'author_followed'):
+            if hasattr(entry, flag):
+                setattr(post, flag, getattr(entry, flag))
+        posts.append(post)
+    return posts
+
+
+def users_over_limit():
+    """Ids of users whose feed holds more than FEED_MAX_LENGTH entries."""
+    return FeedEntry.objects.order_by().values('user_id').annotate(
+        entries=Count('pk')
+    ).filter(entries__gt=max_length()).values_list('user_id', flat=True)
+
+
+def trim_feeds(user_ids):
+    """Drop everything past the newest FEED_MAX_LENGTH entries, in one DELETE."""
+    ranked = FeedEntry.objects.filter(user_id__in=user_ids).annotate(
+        position=Window(
+            RowNumber(),
+            partition_by=[F('user_id')],
+            order_by=[F('created_at').desc(), F('post_id').desc()],
+        )
+    ).filter(position__gt=max_length())
+    FeedEntry.objects.filter(pk__in=ranked.values('pk')).delete()
+
+
+def fan_out_post(post):
+    """Push a newly created post into its author's followers' feeds."""
+    threshold = fanout_threshold()
+    follower_ids = list(
+        Follow.objects.filter(followed_id=post.author_id).values_list('follower_id', flat=True)[:threshold + 1]
+    )
+    if not follower_ids or len(follower_ids) > threshold:
+        return
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, post=post, author_id=post.author_id, created_at=post.created_at)
+            for user_id in follower_ids
+        ],
+        ignore_conflicts=True,
+        batch_size=500,
+    )
+
+
+def backfill_feed(user_id, author_ids):
+    """Copy recent posts from newly followed authors into a user's feed."""
+    author_ids = set(author_ids) - set(popular_author_ids(User.objects.filter(pk__in=author_ids)))
+    if not author_ids:
+        return
+    posts = Post.objects.filter(author_id__in=author_ids).order_by('-created_at')[:max_length()]
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, post_id=post_id, author_id=author_id, created_at=created_at)
+            for post_id, author_id, created_at in posts.values_list('pk', 'author_id', 'created_at')
+        ],
+        ignore_conflicts=True,
+        batch_size=500,
+    )
+    trim_feeds([user_id])
+
+
+def remove_authors_from_feed(user_id, author_ids):
+    """Forget posts from unfollowed authors."""
+    FeedEntry.objects.filter(user_id=user_id, author_id__in=author_ids).delete()
+
+
+def rebuild_feed(user):
+    """Recompute `user`'s materialized feed from scratch."""
+    FeedEntry.objects.filter(user=user).delete()
+    backfill_feed(user.pk, user.following.values_list('pk', flat=True))
@@ -0,0 +1,67 @@
+"""
+Liking and unliking many posts at once.
+
+A batch costs a fixed number of queries however many ids it holds: one
+lookup of the posts, one of the user's existing likes, one bulk INSERT or
+one SELECT and DELETE by id, and one UPDATE recounting the affected posts.
+Bulk writes skip (or mute) the per-row Like signal work, so the counters are
+recounted here and other apps are told through the likes_added/likes_removed
+signals instead.
+
+Both operations are idempotent: liking a liked post or unliking a post
+that was not liked changes nothing and is reported per id.
+"""
+from django.db import transaction
+
+from .models import Like, Post
+from .signals import likes_added, likes_removed, settled_likes
+from . import counters
+
+LIKED, ALREADY_LIKED = 'liked', 'already_liked'
+UNLIKED, NOT_LIKED = 'unliked', 'not_liked'
+NOT_FOUND = 'not_found'
+
+
+def _recount(post_ids):
+    """Set likes_count from the likes table, exact even under concurrent batches."""
+    Post.objects.filter(pk__in=post_ids).update(likes_count=counters.actual_count('likes_count'))
+    counters.invalidate_posts(post_ids)
+
+
+def like_many(user, post_ids):
+    """Like every post in `post_ids`. Returns {post_id: status}."""
+    with transaction.atomic():
+        authors = dict(Post.objects.filter(pk__in=post_ids).values_list('pk', 'author_id'))
+        liked = set(
+            Like.objects.filter(user=user, post_id__in=authors).values_list('post_id', flat=True)
+        )
+        new_ids = [pk for pk in authors if pk not in liked]
+        if new_ids:
+            Like.objects.bulk_create(
+                [Like(user=user, post_id=pk) for pk in new_ids], ignore_conflicts=True
+            )
+            _recount(new_ids)
+            likes_added.send(
+                sender=Like, user=user, posts=[(pk, authors[pk]) for pk in new_ids]
+            )
+
+    return {
+        pk: NOT_FOUND if pk not in authors else ALREADY_LIKED if pk in liked else LIKED
+        for pk in post_ids
+    }
+
+
+def unlike_many(user, post_ids):
+    """Unlike every post in `post_ids`. Returns {post_id: status}."""
+    with transaction.atomic():
+        rows = dict(Like.objects.filter(user=user, post_id__in=post_ids).values_list('pk', 'post_id'))
+        liked = set(rows.values())
+        if liked:
+            # The per-row Like receivers are muted: the recount and
+            # likes_removed below do their work once for the batch
+            with settled_likes():
+                Like.objects.filter(pk__in=rows).delete()
+            _recount(liked)
+            likes_removed.send(sender=Like, user=user, post_ids=sorted(liked))
+
+    return {pk: UNLIKED if pk in liked else NOT_LIKED for pk in post_ids}
@@ -0,0 +1,29 @@
+import gzip
+import sys
+
+from django.core.management.base import BaseCommand
+from posts import bulk
+
+
+class Command(BaseCommand):
+    help = 'Export users, follows, posts, comments and likes as NDJSON (see posts/bulk.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', nargs='?', default='-',
+                            help='File to write, gzip-compressed if it ends in .gz (default: stdout)')
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='Rows fetched from the database at a time')
+        parser.add_argument('--only', nargs='+', choices=list(bulk.KINDS),
+                            help='Export only these row types')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        if output == '-':
+            counts = bulk.export_rows(sys.stdout, options['batch_size'], options['only'])
+        else:
+            opener = gzip.open if output.endswith('.gz') else open
+            with opener(output, 'wt', encoding='utf-8') as stream:
+                counts = bulk.export_rows(stream, options['batch_size'], options['only'])
+        # Keep stdout clean for the data when streaming
+        summary = ', '.join(f'{total} {kind}(s)' for kind, total in counts.items())
+        self.stderr.write(self.style.SUCCESS(f'Exported {summary}'))
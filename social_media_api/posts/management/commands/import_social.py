@@ -0,0 +1,54 @@
+import gzip
+import sys
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from accounts import graph
+from posts import bulk
+
+
+class Command(BaseCommand):
+    help = 'Import NDJSON written by export_social, then rebuild counters, feeds and indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', nargs='?', default='-',
+                            help='File to read, gzip-compressed if it ends in .gz (default: stdin)')
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='Rows inserted per statement and transaction')
+        parser.add_argument('--no-rebuild', action='store_true',
+                            help='Skip rebuilding derived data, e.g. until all files are in')
+        parser.add_argument('--rebuild-only', action='store_true',
+                            help='Only rebuild derived data, reading no input')
+
+    def handle(self, *args, **options):
+        if not options['rebuild_only']:
+            self.load(options)
+        if not options['no_rebuild']:
+            self.rebuild()
+
+    def load(self, options):
+        source = options['input']
+        try:
+            if source == '-':
+                counts = bulk.import_rows(sys.stdin, options['batch_size'])
+            else:
+                opener = gzip.open if source.endswith('.gz') else open
+                with opener(source, 'rt', encoding='utf-8') as stream:
+                    counts = bulk.import_rows(stream, options['batch_size'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        summary = ', '.join(f'{total} {kind}(s)' for kind, total in counts.items())
+        self.stdout.write(f'Read {summary}')
+
+    def rebuild(self):
+        # The import sent no signals; derive everything they would have
+        users = graph.recount()
+        self.stdout.write(f'Recounted the follows of {users} user(s)')
+        for command, kwargs in (
+            ('reconcile_counters', {}),
+            ('rebuild_feeds', {}),
+            ('rebuild_search_index', {}),
+            ('rerank_trending', {'rebuild': True}),
+        ):
+            call_command(command, stdout=self.stdout, **kwargs)
+        self.stdout.write(self.style.SUCCESS('Rebuilt derived data'))
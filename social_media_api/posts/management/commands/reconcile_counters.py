@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+from posts.counters import COUNTED_RELATIONS, actual_count, actual_reply_count
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = 'Recompute denormalized post and comment counters that have drifted from the source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drifted rows without fixing them')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        annotations = {f'actual_{field}': actual_count(field) for field in COUNTED_RELATIONS}
+        drift = Q()
+        for field in COUNTED_RELATIONS:
+            drift |= ~Q(**{field: F(f'actual_{field}')})
+        drifted_ids = list(
+            Post.objects.annotate(**annotations).filter(drift).values_list('pk', flat=True)
+        )
+
+        drifted_comment_ids = list(
+            Comment.objects.annotate(actual=actual_reply_count()).exclude(
+                reply_count=F('actual')
+            ).values_list('pk', flat=True)
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f'{len(drifted_ids)} post(s) have drifted counters')
+            self.stdout.write(f'{len(drifted_comment_ids)} comment(s) have drifted reply counts')
+            return
+
+        batch_size = options['batch_size']
+        for start in range(0, len(drifted_ids), batch_size):
+            with transaction.atomic():
+                Post.objects.filter(pk__in=drifted_ids[start:start + batch_size]).update(
+                    **{field: actual_count(field) for field in COUNTED_RELATIONS}
+                )
+        for start in range(0, len(drifted_comment_ids), batch_size):
+            with transaction.atomic():
+                Comment.objects.filter(pk__in=drifted_comment_ids[start:start + batch_size]).update(
+                    reply_count=actual_reply_count()
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f'Reconciled {len(drifted_ids)} post(s) and {len(drifted_comment_ids)} comment(s)'
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = 'Refresh the trending posts table from the decayed engagement scores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=None,
+                            help='Number of posts to keep (default: TRENDING_SIZE)')
+        parser.add_argument('--rebuild', action='store_true',
+                            help='First recompute every score from the likes and comments tables')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            scored = trending.rebuild_scores()
+            self.stdout.write(f'Rebuilt the scores of {scored} post(s)')
+        ranked = trending.rerank(options['size'])
+        self.stdout.write(self.style.SUCCESS(f'Ranked {ranked} trending post(s)'))
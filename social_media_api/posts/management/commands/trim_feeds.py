@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from posts.feed import max_length, trim_feeds, users_over_limit
+
+
+class Command(BaseCommand):
+    help = 'Trim materialized home feeds to their newest FEED_MAX_LENGTH entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Feeds trimmed per transaction')
+
+    def handle(self, *args, **options):
+        user_ids = list(users_over_limit())
+        batch_size = options['batch_size']
+        for start in range(0, len(user_ids), batch_size):
+            # Short transactions keep the feeds available while trimming
+            with transaction.atomic():
+                trim_feeds(user_ids[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS(
+            f'Trimmed {len(user_ids)} feed(s) to {max_length()} entries'
+        ))
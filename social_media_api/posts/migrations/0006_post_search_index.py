@@ -0,0 +1,52 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:10
+
+from django.db import migrations
+
+# posts.search reads these tables; they exist only for their own database
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE posts_post_fts USING fts5(title, content, tokenize='porter unicode61')",
+    "INSERT INTO posts_post_fts (rowid, title, content) SELECT id, title, content FROM posts_post",
+]
+SQLITE_REVERSE = ["DROP TABLE IF EXISTS posts_post_fts"]
+
+POSTGRES_FORWARD = [
+    """
+    CREATE TABLE posts_post_search (
+        post_id bigint PRIMARY KEY REFERENCES posts_post (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+        document tsvector NOT NULL
+    )
+    """,
+    "CREATE INDEX posts_post_search_document_idx ON posts_post_search USING GIN (document)",
+    """
+    INSERT INTO posts_post_search (post_id, document)
+    SELECT id, setweight(to_tsvector('english', title), 'A') || setweight(to_tsvector('english', content), 'B')
+    FROM posts_post
+    """,
+]
+POSTGRES_REVERSE = ["DROP TABLE IF EXISTS posts_post_search"]
+
+STATEMENTS = {
+    'sqlite': (SQLITE_FORWARD, SQLITE_REVERSE),
+    'postgresql': (POSTGRES_FORWARD, POSTGRES_REVERSE),
+}
+
+
+def run(direction):
+    def operation(apps, schema_editor):
+        statements = STATEMENTS.get(schema_editor.connection.vendor)
+        if statements:
+            for sql in statements[direction]:
+                schema_editor.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_post_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(0), run(1)),
+    ]
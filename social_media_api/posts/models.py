@@ -1,5 +1,55 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from accounts.models import Follow
+
+
+class PostQuerySet(models.QuerySet):
+    def for_api(self, viewer=None):
+        """
+        Load everything PostSerializer reads in a single query, including
+        the viewer-relative liked_by_me/author_followed flags when a
+        viewer is given.
+        """
+        queryset = self.select_related('author')
+        if viewer is not None and viewer.is_authenticated:
+            queryset = queryset.annotate(**viewer_flags(viewer))
+        return queryset
+
+
+def viewer_flags(viewer, post='pk', author='author_id'):
+    """The liked_by_me/author_followed annotations, for the outer row's `post` and `author` columns"""
+    return {
+        'liked_by_me': models.Exists(Like.objects.filter(user=viewer, post=models.OuterRef(post))),
+        'author_followed': models.Exists(
+            Follow.objects.filter(follower=viewer, followed=models.OuterRef(author))
+        ),
+    }
+
+
+class CommentQuerySet(models.QuerySet):
+    def for_api(self):
+        """Load everything CommentSerializer reads in a single query"""
+        return self.select_related('author')
+
+    def thread(self, comment):
+        """`comment` and all its replies, as one range scan on (post, path)"""
+        # Not path__startswith: that is a LIKE, which SQLite will not run on
+        # the index. Every path in the thread extends comment.path, whose
+        # last character is '/', and '0' is the character right after '/'.
+        return self.filter(
+            post_id=comment.post_id,
+            path__gte=comment.path,
+            path__lt=comment.path[:-1] + '0',
+        )
+
+
+# Width of one path segment: a zero-padded comment id
+PATH_SEGMENT_LENGTH = 10
+
+
+def path_segment(pk):
+    return f'{pk:0{PATH_SEGMENT_LENGTH}d}/'
+
 
 class Post(models.Model):
     title = models.CharField(max_length=255)
@@ -11,9 +61,21 @@ class Post(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized counters, kept in step by posts.counters
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    # Engagement score as of trending_updated (a Unix timestamp); see posts.trending
+    trending_score = models.FloatField(default=0.0, editable=False)
+    trending_updated = models.FloatField(default=0.0, editable=False)
+
+    objects = PostQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='post_created_id_idx'),
+            models.Index(fields=['trending_updated'], name='post_trending_updated_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -29,16 +91,50 @@ class Comment(models.Model):
         on_delete=models.CASCADE,
         related_name='comments'
     )
+    # Set for replies; a reply always belongs to its parent's post
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        related_name='replies',
+        blank=True,
+        null=True
+    )
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Materialized path: the ids of the comment's ancestors and its own, as
+    # fixed-width segments. Sorting a post's comments by path lists every
+    # thread depth-first, and a thread is a single path prefix.
+    path = models.CharField(max_length=255, editable=False, default='')
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    # Direct replies, kept in step by posts.counters
+    reply_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = CommentQuerySet.as_manager()
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='comment_created_id_idx'),
+            models.Index(fields=['post', 'created_at', 'id'], name='comment_post_created_idx'),
+            models.Index(fields=['post', 'path'], name='comment_post_path_idx'),
+        ]
     
     def __str__(self):
         return f"Comment by {self.author.username} on {self.post.title}"
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        if self.parent_id:
+            self.depth = self.parent.depth + 1
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # The path ends in the comment's own id, known only after the INSERT
+            prefix = self.parent.path if self.parent_id else ''
+            self.path = prefix + path_segment(self.pk)
+            Comment.objects.filter(pk=self.pk).update(path=self.path)
+
 # NEW: Like model as specified in Step 1
 class Like(models.Model):
     user = models.ForeignKey(
@@ -58,4 +154,69 @@ class Like(models.Model):
         ordering = ['-created_at']
 
     def __str__(self):
-        return f"{self.user.username} likes {self.post.title}"
\ No newline at end of file
+        return f"{self.user.username} likes {self.post.title}"
+
+class FeedEntryQuerySet(models.QuerySet):
+    def for_api(self, viewer=None):
+        """
+        Entries with their posts loaded as PostQuerySet.for_api() would,
+        in the same single query; the viewer flags land on the entries.
+        """
+        queryset = self.select_related('post__author')
+        if viewer is not None and viewer.is_authenticated:
+            queryset = queryset.annotate(**viewer_flags(viewer, post='post_id'))
+        return queryset
+
+
+class FeedEntry(models.Model):
+    """A post materialized into a follower's home feed (fan-out-on-write)."""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    # Copied from the post so unfollows and trims never need to join posts
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    created_at = models.DateTimeField()
+
+    objects = FeedEntryQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='unique_feed_entry'),
+        ]
+        indexes = [
+            # Feed pages and trims seek on (created_at, post_id) within a user
+            models.Index(fields=['user', '-created_at', '-post'], name='feed_user_created_post_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.post.title} in {self.user.username}'s feed"
+
+
+class TrendingPost(models.Model):
+    """One of the top trending posts, as of the last `manage.py rerank_trending`"""
+    rank = models.PositiveSmallIntegerField(unique=True)
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='trending'
+    )
+    score = models.FloatField()
+    ranked_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['rank']
+
+    def __str__(self):
+        return f"#{self.rank}: {self.post.title}"
@@ -0,0 +1,200 @@
+"""
+Full-text search over posts.
+
+Each backend keeps its own index of post titles and contents, updated from
+the Post save/delete signals, so a search is an index lookup instead of a
+LIKE '%term%' scan of the posts table:
+
+- SQLite: an FTS5 virtual table (posts_post_fts), ranked with bm25().
+- PostgreSQL: a tsvector table (posts_post_search) with a GIN index,
+  ranked with ts_rank_cd().
+- Anything else: icontains on title/content (no index).
+
+The tables are created by migration 0006 for the matching database. Title
+matches weigh more than content matches. Set POST_SEARCH_BACKEND to a
+dotted path to override the choice.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+from rest_framework import filters
+
+from .models import Post
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class SearchBackend:
+    def filter(self, queryset, query):
+        """Restrict a Post queryset to posts matching `query`."""
+        raise NotImplementedError
+
+    def ranked(self, query, limit, offset=0):
+        """Return [(post_id, score)] for `query`, best match first."""
+        raise NotImplementedError
+
+    def index_posts(self, posts):
+        """Add or refresh `posts` in the index."""
+
+    def remove_posts(self, post_ids):
+        """Drop `post_ids` from the index."""
+
+    def rebuild(self):
+        """Re-index every post. Returns the number of posts indexed."""
+        return Post.objects.count()
+
+
+class IContainsSearchBackend(SearchBackend):
+    """Fallback without an index: a scan, like DRF's SearchFilter."""
+
+    def _matches(self, query):
+        condition = Q()
+        for word in WORD_RE.findall(query):
+            condition &= Q(title__icontains=word) | Q(content__icontains=word)
+        return condition
+
+    def filter(self, queryset, query):
+        return queryset.filter(self._matches(query))
+
+    def ranked(self, query, limit, offset=0):
+        if not WORD_RE.search(query):
+            return []
+        title_match = Q()
+        for word in WORD_RE.findall(query):
+            title_match &= Q(title__icontains=word)
+        posts = Post.objects.filter(self._matches(query)).annotate(
+            score=Case(When(title_match, then=2), default=1, output_field=IntegerField())
+        ).order_by('-score', '-created_at', '-id')
+        return list(posts.values_list('pk', 'score')[offset:offset + limit])
+
+
+class SQLiteSearchBackend(SearchBackend):
+    table = 'posts_post_fts'
+    # bm25() weights for the title and content columns
+    weights = (10.0, 1.0)
+
+    def match_expression(self, query):
+        # Quote every word so FTS5 operators in user input are taken literally
+        return ' '.join(f'"{word}"' for word in WORD_RE.findall(query))
+
+    def filter(self, queryset, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return queryset.none()
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s', (expression,)
+        ))
+
+    def ranked(self, query, limit, offset=0):
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, -bm25({self.table}, %s, %s) AS score FROM {self.table} '
+                f'WHERE {self.table} MATCH %s ORDER BY score DESC, rowid DESC LIMIT %s OFFSET %s',
+                [*self.weights, expression, limit, offset],
+            )
+            return cursor.fetchall()
+
+    def index_posts(self, posts):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {self.table} (rowid, title, content) VALUES (%s, %s, %s)',
+                [(post.pk, post.title, post.content) for post in posts],
+            )
+
+    def remove_posts(self, post_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(pk,) for pk in post_ids])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, title, content) SELECT id, title, content FROM posts_post'
+            )
+            return cursor.rowcount
+
+
+class PostgresSearchBackend(SearchBackend):
+    table = 'posts_post_search'
+    config = 'english'
+    document = (
+        "setweight(to_tsvector(%s::regconfig, title), 'A') || "
+        "setweight(to_tsvector(%s::regconfig, content), 'B')"
+    )
+
+    def filter(self, queryset, query):
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT post_id FROM {self.table} '
+            f'WHERE document @@ websearch_to_tsquery(%s::regconfig, %s)',
+            (self.config, query),
+        ))
+
+    def ranked(self, query, limit, offset=0):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT post_id, ts_rank_cd(document, query) AS score '
+                f'FROM {self.table}, websearch_to_tsquery(%s::regconfig, %s) query '
+                f'WHERE document @@ query ORDER BY score DESC, post_id DESC LIMIT %s OFFSET %s',
+                [self.config, query, limit, offset],
+            )
+            return cursor.fetchall()
+
+    def _upsert(self, cursor, where, params):
+        cursor.execute(
+            f'INSERT INTO {self.table} (post_id, document) '
+            f'SELECT id, {self.document} FROM posts_post {where} '
+            f'ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document',
+            [self.config, self.config, *params],
+        )
+        return cursor.rowcount
+
+    def index_posts(self, posts):
+        with connection.cursor() as cursor:
+            self._upsert(cursor, 'WHERE id = ANY(%s)', [[post.pk for post in posts]])
+
+    def remove_posts(self, post_ids):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE post_id = ANY(%s)', [list(post_ids)])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            return self._upsert(cursor, '', [])
+
+
+VENDOR_BACKENDS = {
+    'sqlite': 'posts.search.SQLiteSearchBackend',
+    'postgresql': 'posts.search.PostgresSearchBackend',
+}
+
+_backends = {}
+
+
+def get_backend():
+    path = getattr(settings, 'POST_SEARCH_BACKEND', None) or VENDOR_BACKENDS.get(
+        connection.vendor, 'posts.search.IContainsSearchBackend'
+    )
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """SearchFilter (same ?search= parameter) answered from the search index."""
+
+    def filter_queryset(self, request, queryset, view):
+        query = ' '.join(self.get_search_terms(request))
+        if not query:
+            return queryset
+        backend = get_backend()
+        if isinstance(backend, IContainsSearchBackend):
+            # No index to use: behave exactly like SearchFilter
+            return super().filter_queryset(request, queryset, view)
+        return backend.filter(queryset, query)
@@ -1,34 +1,81 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import Post, Comment, Like
-from accounts.serializers import UserSerializer
+from accounts.serializers import AuthorSerializer
+from accounts import graph
 
 class PostSerializer(serializers.ModelSerializer):
-    author = UserSerializer(read_only=True)
+    author = AuthorSerializer(read_only=True)
     author_id = serializers.IntegerField(write_only=True)
-    comments_count = serializers.SerializerMethodField()
-    likes_count = serializers.SerializerMethodField()
+    liked_by_me = serializers.SerializerMethodField()
+    author_followed = serializers.SerializerMethodField()
     
     class Meta:
         model = Post
         fields = ['id', 'title', 'content', 'author', 'author_id', 
-                 'created_at', 'updated_at', 'comments_count', 'likes_count']
-        read_only_fields = ['id', 'created_at', 'updated_at']
-    
-    def get_comments_count(self, obj):
-        return obj.comments.count()
-    
-    def get_likes_count(self, obj):
-        return obj.likes.count()
+                 'created_at', 'updated_at', 'comments_count', 'likes_count',
+                 'liked_by_me', 'author_followed']
+        # Counters are denormalized columns maintained by posts.counters
+        read_only_fields = ['id', 'created_at', 'updated_at', 'comments_count', 'likes_count']
+
+    def _viewer(self):
+        request = self.context.get('request')
+        if request is None or not request.user.is_authenticated:
+            return None
+        return request.user
+
+    # Lists annotate these flags in Post.objects.for_api(viewer); only a
+    # single post that was not loaded that way costs a query
+    def get_liked_by_me(self, obj):
+        value = getattr(obj, 'liked_by_me', None)
+        if value is None:
+            viewer = self._viewer()
+            value = viewer is not None and Like.objects.filter(user=viewer, post=obj).exists()
+        return value
+
+    def get_author_followed(self, obj):
+        value = getattr(obj, 'author_followed', None)
+        if value is None:
+            viewer = self._viewer()
+            value = viewer is not None and graph.is_following(viewer, obj.author_id)
+        return value
 
 class CommentSerializer(serializers.ModelSerializer):
-    author = UserSerializer(read_only=True)
+    author = AuthorSerializer(read_only=True)
     author_id = serializers.IntegerField(write_only=True)
     
     class Meta:
         model = Comment
-        fields = ['id', 'post', 'author', 'author_id', 'content', 
-                 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        fields = ['id', 'post', 'parent', 'author', 'author_id', 'content',
+                 'depth', 'reply_count', 'created_at', 'updated_at']
+        # depth and reply_count are maintained by Comment.save and posts.counters
+        read_only_fields = ['id', 'depth', 'reply_count', 'created_at', 'updated_at']
+
+    def validate(self, data):
+        post = data.get('post') or self.context.get('post')
+        parent = data.get('parent')
+        if self.instance is not None:
+            # The thread path is fixed when a comment is created
+            if (post and post.pk != self.instance.post_id) or \
+                    ('parent' in data and getattr(parent, 'pk', None) != self.instance.parent_id):
+                raise serializers.ValidationError('A comment cannot be moved to another post or thread.')
+            return data
+        if parent is not None:
+            if post is not None and parent.post_id != post.pk:
+                raise serializers.ValidationError({'parent': 'The parent comment belongs to another post.'})
+            max_depth = getattr(settings, 'COMMENT_MAX_DEPTH', 10)
+            if parent.depth + 1 > max_depth:
+                raise serializers.ValidationError(
+                    {'parent': f'Replies can be nested at most {max_depth} levels deep.'}
+                )
+        return data
+
+class PostCommentSerializer(CommentSerializer):
+    """Comment under /posts/<pk>/comments/, where the URL names the post"""
+    author_id = serializers.IntegerField(write_only=True, required=False)
+
+    class Meta(CommentSerializer.Meta):
+        read_only_fields = CommentSerializer.Meta.read_only_fields + ['post']
 
 class LikeSerializer(serializers.ModelSerializer):
     """Serializer for Like model"""
@@ -37,4 +84,29 @@ class LikeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Like
         fields = ['id', 'user', 'post', 'created_at']
-        read_only_fields = ['id', 'user', 'created_at']
\ No newline at end of file
+        read_only_fields = ['id', 'user', 'created_at']
+
+class BatchLikeSerializer(serializers.Serializer):
+    """Post ids to like and unlike in one request"""
+    like = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        max_length=100
+    )
+    unlike = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        max_length=100
+    )
+
+    def validate(self, data):
+        like = list(dict.fromkeys(data.get('like', [])))
+        unlike = list(dict.fromkeys(data.get('unlike', [])))
+        if not like and not unlike:
+            raise serializers.ValidationError('Provide post ids to like and/or unlike.')
+        both = set(like) & set(unlike)
+        if both:
+            raise serializers.ValidationError(
+                f'Cannot like and unlike the same post: {sorted(both)}'
+            )
+        return {'like': like, 'unlike': unlike}
@@ -0,0 +1,185 @@
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+from accounts.models import Follow
+from accounts.signals import cascades_from
+from social_media_api import response_cache
+from .models import Comment, Like, Post
+from . import counters, feed, search, trending
+
+# Sent by posts.likes for batch likes/unlikes, which skip the per-row Like
+# signals. likes_added gets user and posts=[(post_id, author_id)];
+# likes_removed gets user and post_ids.
+likes_added = Signal()
+likes_removed = Signal()
+
+User = get_user_model()
+
+# Set while posts.likes deletes likes it accounts for itself
+_likes_settled = ContextVar('likes_settled', default=False)
+
+
+@contextmanager
+def settled_likes():
+    """Leave the counters and scores of likes deleted in this block to the caller."""
+    token = _likes_settled.set(True)
+    try:
+        yield
+    finally:
+        _likes_settled.reset(token)
+
+
+def removed_engagement(origin):
+    """Per-post likes and comments (and per-comment replies) removed with a user"""
+    if not hasattr(origin, '_removed_engagement'):
+        origin._removed_engagement = defaultdict(Counter)
+    return origin._removed_engagement
+
+
+@receiver(post_save, sender=Post)
+def push_post_to_feeds(sender, instance, created, **kwargs):
+    """Fan a new post out to its author's followers"""
+    if created:
+        feed.fan_out_post(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_responses(sender, instance, **kwargs):
+    """Expire cached responses of the post"""
+    response_cache.invalidate(response_cache.object_key(instance))
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, update_fields=None, **kwargs):
+    """Keep the post's search index entry up to date"""
+    if update_fields is None or {'title', 'content'} & set(update_fields):
+        search.get_backend().index_posts([instance])
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    """Drop a deleted post from the search index"""
+    search.get_backend().remove_posts([instance.pk])
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed_on_follow(sender, instance, created, **kwargs):
+    """Copy the newly followed author's recent posts into the follower's feed"""
+    if created:
+        feed.backfill_feed(instance.follower_id, [instance.followed_id])
+
+
+@receiver(post_delete, sender=Follow)
+def prune_feed_on_unfollow(sender, instance, origin=None, **kwargs):
+    """Drop the unfollowed author's posts from the follower's feed"""
+    if cascades_from(origin, User):
+        # The deleted user's feed entries and posts (with their entries) cascade too
+        return
+    feed.remove_authors_from_feed(instance.follower_id, [instance.followed_id])
+
+
+@receiver(post_save, sender=Like)
+def count_like(sender, instance, created, **kwargs):
+    """Bump the post's like counter"""
+    if created:
+        counters.adjust([instance.post_id], 'likes_count', 1)
+
+
+@receiver(post_delete, sender=Like)
+def uncount_like(sender, instance, origin=None, **kwargs):
+    """Drop the post's like counter"""
+    if cascades_from(origin, Post) or _likes_settled.get():
+        # The post is deleted too, or the caller recounts
+        return
+    if cascades_from(origin, User):
+        # Settled for all of the user's likes at once by settle_removed_engagement
+        removed_engagement(origin)['likes_count'][instance.post_id] += 1
+        return
+    counters.adjust([instance.post_id], 'likes_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    """Bump the post's comment counter and the parent's reply counter"""
+    if created:
+        counters.adjust([instance.post_id], 'comments_count', 1)
+        if instance.parent_id:
+            counters.adjust_replies([instance.parent_id], 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, origin=None, **kwargs):
+    """Drop the post's comment counter and the parent's reply counter"""
+    if cascades_from(origin, Post):
+        return
+    if cascades_from(origin, User):
+        removed = removed_engagement(origin)
+        removed['comments_count'][instance.post_id] += 1
+        if instance.parent_id:
+            removed['reply_count'][instance.parent_id] += 1
+        return
+    counters.adjust([instance.post_id], 'comments_count', -1)
+    if instance.parent_id:
+        counters.adjust_replies([instance.parent_id], -1)
+
+
+@receiver(post_save, sender=Like)
+@receiver(post_save, sender=Comment)
+def score_engagement(sender, instance, created, **kwargs):
+    """Raise the post's trending score"""
+    if created:
+        trending.record([instance.post_id], 'like' if sender is Like else 'comment')
+
+
+@receiver(post_delete, sender=Like)
+@receiver(post_delete, sender=Comment)
+def unscore_engagement(sender, instance, origin=None, **kwargs):
+    """Take a withdrawn like or comment back off the post's trending score"""
+    if cascades_from(origin, Post) or cascades_from(origin, User):
+        # Nothing to score on a deleted post; a deleted user's engagement
+        # is settled by settle_removed_engagement
+        return
+    if sender is Like and _likes_settled.get():
+        return
+    trending.record([instance.post_id], 'like' if sender is Like else 'comment', count=-1)
+
+
+@receiver(post_delete, sender=User)
+def settle_removed_engagement(sender, instance, origin=None, **kwargs):
+    """
+    Take a deleted user's likes and comments off the counters and trending
+    scores of the posts that remain, with one UPDATE per distinct count
+    rather than a few per row.
+    """
+    removed = getattr(origin, '_removed_engagement', None)
+    if not removed:
+        return
+    del origin._removed_engagement
+    events = {'likes_count': 'like', 'comments_count': 'comment'}
+    for field, counts in removed.items():
+        by_count = defaultdict(list)
+        for pk, count in counts.items():
+            by_count[count].append(pk)
+        for count, pks in by_count.items():
+            if field == 'reply_count':
+                counters.adjust_replies(pks, -count)
+            else:
+                counters.adjust(pks, field, -count)
+                trending.record(pks, events[field], count=-count)
+
+
+@receiver(likes_added)
+def score_batch_likes(sender, user, posts, **kwargs):
+    """Raise the trending scores of posts liked in a batch"""
+    trending.record([post_id for post_id, _ in posts], 'like')
+
+
+@receiver(likes_removed)
+def unscore_batch_likes(sender, user, post_ids, **kwargs):
+    """Lower the trending scores of posts unliked in a batch"""
+    trending.record(post_ids, 'like', count=-1)
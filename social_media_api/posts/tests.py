@@ -1,3 +1,989 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.utils.http import http_date
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from accounts import graph
+from social_media_api import query_budget
+from social_media_api.middleware import ConcurrencyLimitMiddleware
+from social_media_api.query_budget import QueryBudgetMixin
+from social_media_api.throttling import TokenBucketThrottle
+from . import likes, trending
+from .models import Post, Comment, Like, FeedEntry, TrendingPost
+from .search import get_backend as get_search_backend
 
-# Create your tests here.
+User = get_user_model()
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class FeedTestCase(TestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.stranger = User.objects.create_user(username='stranger', password='testpass123')
+        graph.follow(self.reader, self.author)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.reader)
+
+    def feed_titles(self):
+        response = self.client.get('/api/feed/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [post['title'] for post in response.data['results']]
+
+    def test_new_post_is_pushed_to_followers(self):
+        Post.objects.create(title='Followed', content='...', author=self.author)
+        Post.objects.create(title='Not followed', content='...', author=self.stranger)
+
+        self.assertEqual(FeedEntry.objects.filter(user=self.reader).count(), 1)
+        self.assertEqual(self.feed_titles(), ['Followed'])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        Post.objects.create(title='Older post', content='...', author=self.stranger)
+
+        graph.follow(self.reader, self.stranger)
+        self.assertEqual(self.feed_titles(), ['Older post'])
+
+        graph.unfollow(self.reader, self.stranger)
+        self.assertEqual(self.feed_titles(), [])
+
+    @override_settings(FEED_MAX_LENGTH=2)
+    def test_feed_is_trimmed(self):
+        for i in range(4):
+            Post.objects.create(title=f'Post {i}', content='...', author=self.author)
+        # New posts do not trim in the request; trim_feeds does
+        self.assertEqual(FeedEntry.objects.filter(user=self.reader).count(), 4)
+
+        call_command('trim_feeds', stdout=StringIO())
+        self.assertEqual(FeedEntry.objects.filter(user=self.reader).count(), 2)
+        self.assertEqual(self.feed_titles(), ['Post 3', 'Post 2'])
+
+    @override_settings(FEED_FANOUT_THRESHOLD=0)
+    def test_popular_author_is_pulled_at_read_time(self):
+        Post.objects.create(title='Celebrity post', content='...', author=self.author)
+
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(self.feed_titles(), ['Celebrity post'])
+
+    def test_pushed_and_pulled_posts_page_together(self):
+        celebrity = User.objects.create_user(username='celebrity', password='testpass123')
+        User.objects.filter(pk=celebrity.pk).update(followers_count=10)
+        graph.follow(self.reader, celebrity)
+        for i in range(5):
+            Post.objects.create(title=f'Pushed {i}', content='...', author=self.author)
+            with override_settings(FEED_FANOUT_THRESHOLD=0):
+                Post.objects.create(title=f'Pulled {i}', content='...', author=celebrity)
+
+        expected = list(Post.objects.order_by('-created_at', '-id').values_list('title', flat=True))
+        titles, url = [], '/api/feed/?page_size=3'
+        with override_settings(FEED_FANOUT_THRESHOLD=5):
+            while url:
+                response = self.client.get(url)
+                titles += [post['title'] for post in response.data['results']]
+                url = response.data['next']
+            self.assertEqual(titles, expected)
+
+            response = self.client.get(response.data['previous'])
+            self.assertEqual([post['title'] for post in response.data['results']], expected[-4:-1])
+
+    def test_feed_page_seeks_the_feed_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Reads an SQLite query plan')
+        for i in range(3):
+            Post.objects.create(title=f'Post {i}', content='...', author=self.author)
+        response = self.client.get('/api/feed/?page_size=2')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(response.data['next'])
+        sql = next(q['sql'] for q in queries.captured_queries if 'posts_feedentry' in q['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('feed_user_created_post_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='testpass123')
+        self.posts = [
+            Post.objects.create(title=f'Post {i}', content='...', author=self.user)
+            for i in range(5)
+        ]
+        # Force a tie on created_at so the id tie-breaker is exercised
+        Post.objects.filter(pk=self.posts[2].pk).update(created_at=self.posts[3].created_at)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_walks_every_post_once_without_counting(self):
+        expected = list(Post.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        seen = []
+        url = '/api/posts/?page_size=2'
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            self.assertFalse(any(
+                'COUNT(' in q['sql'] and 'FROM "posts_post"' in q['sql']
+                for q in queries.captured_queries
+            ))
+            seen.extend(post['id'] for post in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, expected)
+
+    def test_previous_link_returns_to_earlier_page(self):
+        first = self.client.get('/api/posts/?page_size=2')
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [post['id'] for post in back.data['results']],
+            [post['id'] for post in first.data['results']],
+        )
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/posts/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PostCountersTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.post = Post.objects.create(title='Counted', content='...', author=self.author)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.reader)
+
+    def test_like_and_unlike_update_counter(self):
+        self.client.post(f'/api/posts/{self.post.id}/like/')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+
+        self.client.delete(f'/api/posts/{self.post.id}/unlike/')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+    def test_comment_create_and_delete_update_counter(self):
+        comment = Comment.objects.create(post=self.post, author=self.reader, content='Nice')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_deleting_a_post_skips_per_row_counter_updates(self):
+        fans = [User.objects.create_user(username=f'fan{i}', password='testpass123') for i in range(3)]
+        for fan in fans:
+            Like.objects.create(user=fan, post=self.post)
+            Comment.objects.create(post=self.post, author=fan, content='Hi')
+
+        def delete_queries(post):
+            with CaptureQueriesContext(connection) as queries:
+                post.delete()
+            return len(queries)
+
+        few = delete_queries(self.post)
+        post = Post.objects.create(title='Popular', content='...', author=self.author)
+        for fan in fans * 3:
+            Like.objects.get_or_create(user=fan, post=post)
+            Comment.objects.create(post=post, author=fan, content='Hi')
+        self.assertEqual(delete_queries(post), few)
+
+    def test_deleting_a_user_settles_their_engagement(self):
+        other = Post.objects.create(title='Other', content='...', author=self.author)
+        friend = User.objects.create_user(username='friend', password='testpass123')
+        root = Comment.objects.create(post=self.post, author=friend, content='Root')
+        for post in (self.post, other):
+            Like.objects.create(user=self.reader, post=post)
+            Like.objects.create(user=friend, post=post)
+            Comment.objects.create(post=post, author=self.reader, content='Hi')
+        Comment.objects.create(post=self.post, author=self.reader, content='Reply', parent=root)
+        Comment.objects.create(post=self.post, author=self.reader, content='Reply', parent=root)
+        scores = dict(Post.objects.values_list('pk', 'trending_score'))
+
+        self.reader.delete()
+        for post, likes_count, comments_count in ((self.post, 1, 1), (other, 1, 0)):
+            post.refresh_from_db()
+            self.assertEqual((post.likes_count, post.comments_count), (likes_count, comments_count))
+            self.assertLess(post.trending_score, scores[post.pk])
+        root.refresh_from_db()
+        self.assertEqual(root.reply_count, 0)
+
+    def test_reconcile_counters_repairs_drift(self):
+        Like.objects.create(user=self.reader, post=self.post)
+        Post.objects.filter(pk=self.post.pk).update(likes_count=7, comments_count=3)
+
+        call_command('reconcile_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.comments_count), (1, 0))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class QueryCountTestCase(TestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        authors = [
+            User.objects.create_user(username=f'author{i}', password='testpass123')
+            for i in range(3)
+        ]
+        for author in authors:
+            graph.follow(self.reader, author)
+        for i in range(12):
+            post = Post.objects.create(title=f'Post {i}', content='...', author=authors[i % 3])
+            Comment.objects.create(post=post, author=authors[(i + 1) % 3], content='...')
+            Like.objects.create(post=post, user=self.reader)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.reader)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        for endpoint in ['/api/posts/', '/api/feed/', '/api/comments/']:
+            with self.subTest(endpoint=endpoint):
+                small = self.count_queries(f'{endpoint}?page_size=2')
+                large = self.count_queries(f'{endpoint}?page_size=10')
+                self.assertEqual(small, large)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PostSearchTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='testpass123')
+        self.in_title = Post.objects.create(
+            title='Running tips', content='Warm up first.', author=self.user
+        )
+        self.in_content = Post.objects.create(
+            title='Weekend', content='Went running by the river.', author=self.user
+        )
+        self.unrelated = Post.objects.create(title='Cooking', content='Pasta night.', author=self.user)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def search_ids(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(any(' LIKE ' in q['sql'] for q in queries.captured_queries))
+        return [post['id'] for post in response.data['results']]
+
+    def test_search_filter_uses_index(self):
+        # Stemmed: "run" matches "Running" and "running"
+        self.assertCountEqual(
+            self.search_ids('/api/posts/?search=run'), [self.in_title.id, self.in_content.id]
+        )
+        # Query syntax characters are searched for literally, not parsed
+        self.assertEqual(self.search_ids('/api/posts/?search=pasta"*%20-('), [self.unrelated.id])
+
+    def test_search_endpoint_ranks_title_matches_first(self):
+        response = self.client.get('/api/posts/search/?q=running&page_size=1')
+        self.assertEqual([post['id'] for post in response.data['results']], [self.in_title.id])
+        self.assertIn('relevance', response.data['results'][0])
+        self.assertEqual(self.search_ids(response.data['next']), [self.in_content.id])
+
+        response = self.client.get('/api/posts/search/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_index_follows_edits_and_deletes(self):
+        self.unrelated.content = 'Pasta after running.'
+        self.unrelated.save()
+        self.in_title.delete()
+        self.assertCountEqual(
+            self.search_ids('/api/posts/search/?q=running'), [self.in_content.id, self.unrelated.id]
+        )
+
+    def test_rebuild_search_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM posts_post_fts')
+        self.assertEqual(self.search_ids('/api/posts/search/?q=pasta'), [])
+
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.search_ids('/api/posts/search/?q=pasta'), [self.unrelated.id])
+
+    @override_settings(POST_SEARCH_BACKEND='posts.search.IContainsSearchBackend')
+    def test_icontains_fallback(self):
+        response = self.client.get('/api/posts/search/?q=running')
+        self.assertEqual(
+            [post['id'] for post in response.data['results']], [self.in_title.id, self.in_content.id]
+        )
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class BatchLikeTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.posts = [
+            Post.objects.create(title=f'Post {i}', content='...', author=self.author)
+            for i in range(6)
+        ]
+        Like.objects.create(user=self.reader, post=self.posts[0])
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.reader)
+
+    def batch(self, data):
+        return self.client.post('/api/posts/likes/batch/', data, format='json')
+
+    def test_like_and_unlike_report_per_id(self):
+        ids = [post.id for post in self.posts]
+        response = self.batch({'like': [ids[0], ids[1], 999999], 'unlike': [ids[2]]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [
+            {'post': ids[0], 'action': 'like', 'status': 'already_liked'},
+            {'post': ids[1], 'action': 'like', 'status': 'liked'},
+            {'post': 999999, 'action': 'like', 'status': 'not_found'},
+            {'post': ids[2], 'action': 'unlike', 'status': 'not_liked'},
+        ])
+        self.assertEqual(response.data['posts'], [
+            {'id': ids[0], 'likes_count': 1},
+            {'id': ids[1], 'likes_count': 1},
+            {'id': ids[2], 'likes_count': 0},
+        ])
+
+        response = self.batch({'unlike': [ids[0], ids[1]]})
+        self.assertEqual([r['status'] for r in response.data['results']], ['unliked', 'unliked'])
+        self.assertFalse(Like.objects.exists())
+        self.assertEqual(
+            list(Post.objects.filter(pk__in=ids[:2]).values_list('likes_count', flat=True)), [0, 0]
+        )
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        counts = []
+        for posts in (self.posts[1:3], self.posts[3:6]):
+            ids = [post.id for post in posts]
+            for action in ('like', 'unlike'):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.batch({action: ids})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                counts.append(len(queries))
+        self.assertEqual(counts[:2], counts[2:])
+
+    def test_rejects_conflicting_or_empty_batches(self):
+        post_id = self.posts[1].id
+        self.assertEqual(self.batch({'like': [post_id], 'unlike': [post_id]}).status_code, 400)
+        self.assertEqual(self.batch({}).status_code, 400)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ViewerFlagsTestCase(TestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.followed = User.objects.create_user(username='followed', password='testpass123')
+        self.stranger = User.objects.create_user(username='stranger', password='testpass123')
+        graph.follow(self.reader, self.followed)
+        self.liked = Post.objects.create(title='Liked', content='...', author=self.followed)
+        self.unliked = Post.objects.create(title='Unliked', content='...', author=self.followed)
+        self.other = Post.objects.create(title='Other', content='...', author=self.stranger)
+        Like.objects.create(user=self.reader, post=self.liked)
+        Like.objects.create(user=self.stranger, post=self.unliked)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.reader)
+
+    def flags(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Flags come from the page query itself
+        self.assertFalse(any('FROM "posts_like"' in q['sql'] and 'posts_post' not in q['sql']
+                             for q in queries.captured_queries))
+        return {
+            post['title']: (post['liked_by_me'], post['author_followed'])
+            for post in response.data['results']
+        }
+
+    def test_list_and_feed_flags(self):
+        expected = {'Liked': (True, True), 'Unliked': (False, True), 'Other': (False, False)}
+        self.assertEqual(self.flags('/api/posts/'), expected)
+        self.assertEqual(self.flags('/api/feed/'), {'Liked': (True, True), 'Unliked': (False, True)})
+
+    def test_flags_are_relative_to_the_viewer(self):
+        self.client.force_authenticate(user=self.stranger)
+        self.assertEqual(self.flags('/api/posts/')['Unliked'], (True, False))
+
+    def test_created_post_has_flags(self):
+        response = self.client.post(
+            '/api/posts/', {'title': 'New', 'content': '...', 'author_id': self.reader.id}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['liked_by_me'], response.data['author_followed']), (False, False))
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'posts-tests'}},
+)
+class PostResponseCacheTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.post = Post.objects.create(title='Cached', content='...', author=self.author)
+        self.url = f'/api/posts/{self.post.id}/'
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.reader)
+
+    def test_repeat_reads_skip_the_database(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_changes_invalidate_the_cached_response(self):
+        etag = self.client.get(self.url)['ETag']
+
+        self.client.post(f'/api/posts/{self.post.id}/like/')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['likes_count'], response.data['liked_by_me']), (1, True))
+
+        self.author.bio = 'Updated bio'
+        self.author.save()
+        self.assertEqual(self.client.get(self.url).data['author']['bio'], 'Updated bio')
+
+        graph.follow(self.reader, self.author)
+        self.assertTrue(self.client.get(self.url).data['author_followed'])
+
+        self.post.title = 'Edited'
+        self.post.save()
+        self.assertEqual(self.client.get(self.url).data['title'], 'Edited')
+
+    def test_responses_are_cached_per_viewer(self):
+        Like.objects.create(user=self.reader, post=self.post)
+        self.assertTrue(self.client.get(self.url).data['liked_by_me'])
+        self.client.force_authenticate(user=self.author)
+        self.assertFalse(self.client.get(self.url).data['liked_by_me'])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ConditionalGetTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.posts = [
+            Post.objects.create(title=f'Post {i}', content='...', author=self.author)
+            for i in range(3)
+        ]
+        self.comment = Comment.objects.create(post=self.posts[0], author=self.author, content='First')
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.author)
+
+    def test_unchanged_list_is_not_reserialized(self):
+        first = self.client.get('/api/posts/')
+        self.assertNotIn('Last-Modified', first)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/posts/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(queries), 1)
+
+        # Changes that leave updated_at alone still change the ETag
+        Like.objects.create(user=self.author, post=self.posts[1])
+        response = self.client.get('/api/posts/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        self.posts[2].delete()
+        response = self.client.get('/api/posts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_comment_if_none_match(self):
+        url = f'/api/comments/{self.comment.id}/'
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Comment.objects.filter(pk=self.comment.pk).update(
+            updated_at=self.comment.updated_at + timedelta(seconds=5)
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get('/api/comments/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get('/api/comments/abc/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_replies_change_the_comment_etag(self):
+        url = f'/api/comments/{self.comment.id}/'
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(post=self.posts[0], author=self.author, content='Reply', parent=self.comment)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['reply_count'], 1)
+
+    def test_post_detail_has_validators(self):
+        response = self.client.get(f'/api/posts/{self.posts[0].id}/')
+        self.assertNotIn('Last-Modified', response)
+        response = self.client.get(f'/api/posts/{self.posts[0].id}/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_if_modified_since_sees_likes(self):
+        # A like leaves updated_at alone, so a date validator would give a stale 304
+        since = http_date(time.time() + 60)
+        for url in ('/api/posts/', f'/api/posts/{self.posts[0].id}/'):
+            self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+        Like.objects.create(user=self.author, post=self.posts[0])
+        for url in ('/api/posts/', f'/api/posts/{self.posts[0].id}/'):
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['likes_count'], 1)
+        self.assertTrue(response.data['liked_by_me'])
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'throttle-tests'}},
+    REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {'likes': '2/min', 'likes.ip': '3/min'}},
+)
+class LikeThrottleTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+        self.posts = [Post.objects.create(author=self.author, title=f'Post {i}', content='Body') for i in range(4)]
+        self.client = APIClient()
+
+    def like(self, user, post, ip='10.0.0.1'):
+        self.client.force_authenticate(user=user)
+        return self.client.post(f'/api/posts/{post.id}/like/', REMOTE_ADDR=ip)
+
+    def test_user_bucket_refills_over_time(self):
+        clock = [1000.0]
+        with mock.patch.object(TokenBucketThrottle, 'timer', lambda self: clock[0]):
+            self.assertEqual(self.like(self.alice, self.posts[0]).status_code, status.HTTP_201_CREATED)
+            self.assertEqual(self.like(self.alice, self.posts[1]).status_code, status.HTTP_201_CREATED)
+
+            with CaptureQueriesContext(connection) as queries:
+                response = self.like(self.alice, self.posts[2])
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertEqual(response['Retry-After'], '30')
+            self.assertEqual(len(queries), 0)
+            self.assertFalse(Like.objects.filter(user=self.alice, post=self.posts[2]).exists())
+
+            # Half a token per 15 seconds: one more like after 30
+            clock[0] += 30
+            self.assertEqual(self.like(self.alice, self.posts[2]).status_code, status.HTTP_201_CREATED)
+            self.assertEqual(self.like(self.alice, self.posts[3]).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_users_share_the_address_bucket(self):
+        self.like(self.alice, self.posts[0])
+        self.like(self.alice, self.posts[1])
+        self.assertEqual(self.like(self.bob, self.posts[0]).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.like(self.bob, self.posts[1]).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.like(self.author, self.posts[1], ip='10.0.0.2').status_code, status.HTTP_201_CREATED)
+
+    def test_unscoped_views_are_not_throttled(self):
+        self.client.force_authenticate(user=self.alice)
+        for _ in range(5):
+            self.assertEqual(self.client.get('/api/posts/').status_code, status.HTTP_200_OK)
+
+
+class ConcurrencyLimitTestCase(TestCase):
+    @override_settings(MAX_CONCURRENT_WRITES=1)
+    def test_writes_over_the_limit_are_shed(self):
+        factory = RequestFactory()
+        inner = []
+
+        def get_response(request):
+            # A second write arriving while this one holds the only slot
+            if not inner:
+                inner.append(middleware(factory.post('/api/posts/1/like/')))
+            return HttpResponse(status=201)
+
+        middleware = ConcurrencyLimitMiddleware(get_response)
+        self.assertEqual(middleware(factory.post('/api/posts/1/like/')).status_code, 201)
+        self.assertEqual(inner[0].status_code, 503)
+        self.assertEqual(inner[0]['Retry-After'], '1')
+
+        # Reads are never shed, and the slot is free again afterwards
+        inner.append(None)
+        self.assertEqual(middleware(factory.get('/api/posts/')).status_code, 201)
+        self.assertEqual(middleware(factory.post('/api/posts/1/like/')).status_code, 201)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class CommentThreadTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.post = Post.objects.create(author=self.author, title='Threads', content='Body')
+        self.other_post = Post.objects.create(author=self.author, title='Other', content='Body')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.reader)
+        self.url = f'/api/posts/{self.post.id}/comments/'
+
+    def comment(self, content, parent=None):
+        data = {'content': content}
+        if parent is not None:
+            data['parent'] = parent
+        response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        return response.data['id']
+
+    def contents(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [comment['content'] for comment in response.data['results']]
+
+    def test_lists_only_the_posts_comments_oldest_first(self):
+        for i in range(3):
+            self.comment(f'Comment {i}')
+        Comment.objects.create(post=self.other_post, author=self.reader, content='Elsewhere')
+
+        response = self.client.get(self.url, {'page_size': 2})
+        self.assertEqual(self.contents(response), ['Comment 0', 'Comment 1'])
+        self.assertEqual(self.contents(self.client.get(response.data['next'])), ['Comment 2'])
+        self.assertEqual(self.client.get('/api/posts/999999/comments/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_threads_load_depth_first_in_one_range_query(self):
+        first = self.comment('First')
+        second = self.comment('Second')
+        reply = self.comment('Reply to first', parent=first)
+        self.comment('Reply to second', parent=second)
+        self.comment('Nested reply', parent=reply)
+        self.comment('Another reply to first', parent=first)
+
+        response = self.client.get(self.url, {'order': 'thread'})
+        self.assertEqual(self.contents(response), [
+            'First', 'Reply to first', 'Nested reply', 'Another reply to first',
+            'Second', 'Reply to second',
+        ])
+        self.assertEqual([c['depth'] for c in response.data['results']], [0, 1, 2, 1, 0, 1])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'thread': first, 'page_size': 2})
+        self.assertEqual(self.contents(response), ['First', 'Reply to first'])
+        # The post, the thread root and the page
+        self.assertEqual(len(queries), 3)
+        self.assertNotIn('LIKE', queries[-1]['sql'])
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + queries[-1]['sql'])
+                plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+            self.assertIn('comment_post_path_idx (post_id=? AND path>? AND path<?)', plan)
+        self.assertEqual(
+            self.contents(self.client.get(response.data['next'])),
+            ['Nested reply', 'Another reply to first'],
+        )
+
+    def test_reply_counts_are_maintained(self):
+        root = self.comment('Root')
+        reply = self.comment('Reply', parent=root)
+        self.comment('Nested', parent=reply)
+        self.assertEqual(Comment.objects.get(pk=root).reply_count, 1)
+        self.assertEqual(Comment.objects.get(pk=reply).reply_count, 1)
+
+        self.client.force_authenticate(user=self.reader)
+        self.assertEqual(self.client.delete(f'/api/comments/{reply}/').status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(Comment.objects.get(pk=root).reply_count, 0)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+        Comment.objects.filter(pk=root).update(reply_count=5)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(Comment.objects.get(pk=root).reply_count, 0)
+
+    def test_invalid_replies_are_rejected(self):
+        elsewhere = Comment.objects.create(post=self.other_post, author=self.reader, content='Elsewhere')
+        response = self.client.post(self.url, {'content': 'Hi', 'parent': elsewhere.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('parent', response.data)
+
+        root = self.comment('Root')
+        with self.settings(COMMENT_MAX_DEPTH=1):
+            reply = self.comment('Reply', parent=root)
+            response = self.client.post(self.url, {'content': 'Too deep', 'parent': reply})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.patch(f'/api/comments/{reply}/', {'parent': ''})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'thread': 'x'}).status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    TRENDING_HALF_LIFE=3600,
+    TRENDING_WEIGHTS={'like': 1.0, 'comment': 2.0},
+)
+class TrendingTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.fans = [User.objects.create_user(username=f'fan{i}', password='testpass123') for i in range(3)]
+        self.old = Post.objects.create(author=self.author, title='Old news', content='Body')
+        self.new = Post.objects.create(author=self.author, title='Breaking', content='Body')
+        self.quiet = Post.objects.create(author=self.author, title='Quiet', content='Body')
+        self.clock = 1_000_000.0
+        patcher = mock.patch.object(trending, 'now', lambda: self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.fans[0])
+
+    def score(self, post):
+        post.refresh_from_db()
+        return post.trending_score
+
+    def test_scores_decay_between_events(self):
+        Like.objects.create(user=self.fans[0], post=self.old)
+        self.assertAlmostEqual(self.score(self.old), 1.0)
+
+        self.clock += 3600
+        Comment.objects.create(post=self.old, author=self.fans[1], content='Hi')
+        self.assertAlmostEqual(self.score(self.old), 2.5)
+
+        self.clock += 3600
+        Like.objects.filter(user=self.fans[0], post=self.old).delete()
+        self.assertAlmostEqual(self.score(self.old), 0.25)
+
+        Comment.objects.filter(post=self.old).delete()
+        self.assertEqual(self.score(self.old), 0.0)
+
+    def test_batch_likes_are_scored(self):
+        likes.like_many(self.fans[0], [self.old.id, self.new.id])
+        self.assertAlmostEqual(self.score(self.new), 1.0)
+        likes.unlike_many(self.fans[0], [self.new.id])
+        self.assertAlmostEqual(self.score(self.new), 0.0)
+
+    def test_rerank_prefers_recent_engagement(self):
+        for fan in self.fans:
+            Like.objects.create(user=fan, post=self.old)
+        self.clock += 2 * 3600
+        for fan in self.fans[:2]:
+            Like.objects.create(user=fan, post=self.new)
+        self.clock += 60
+
+        call_command('rerank_trending', stdout=StringIO())
+        self.assertEqual(
+            list(TrendingPost.objects.values_list('rank', 'post')),
+            [(1, self.new.id), (2, self.old.id)],
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/posts/trending/', {'page_size': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+        result = response.data['results'][0]
+        self.assertEqual((result['id'], result['rank'], result['liked_by_me']), (self.new.id, 1, True))
+        self.assertIsNotNone(response.data['next'])
+
+        call_command('rerank_trending', size=1, stdout=StringIO())
+        self.assertEqual(list(TrendingPost.objects.values_list('post', flat=True)), [self.new.id])
+
+    def test_rebuild_recomputes_scores_from_rows(self):
+        with mock.patch.object(trending, 'now', time.time):
+            Like.objects.create(user=self.fans[0], post=self.new)
+            Comment.objects.create(post=self.new, author=self.fans[1], content='Hi')
+            Post.objects.filter(pk=self.quiet.pk).update(trending_score=9.0)
+            Post.objects.filter(pk=self.new.pk).update(trending_score=0.0)
+
+            call_command('rerank_trending', rebuild=True, stdout=StringIO())
+        self.assertAlmostEqual(self.score(self.new), 3.0, places=2)
+        self.assertEqual(self.score(self.quiet), 0.0)
+        self.assertEqual(list(TrendingPost.objects.values_list('post', flat=True)), [self.new.id])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class BulkTransferTestCase(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='testpass123', bio='Hi')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+        graph.follow(self.alice, self.bob)
+        self.post = Post.objects.create(author=self.bob, title='Pasta night', content='Recipes')
+        self.comment = Comment.objects.create(post=self.post, author=self.alice, content='Yum')
+        self.reply = Comment.objects.create(post=self.post, author=self.bob, content='Thanks', parent=self.comment)
+        Like.objects.create(user=self.alice, post=self.post)
+        Post.objects.filter(pk=self.post.pk).update(created_at=self.post.created_at - timedelta(days=3))
+        self.post.refresh_from_db()
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'social.ndjson.gz')
+
+    def test_round_trip_restores_rows_and_derived_data(self):
+        call_command('export_social', self.path, stderr=StringIO())
+        User.objects.all().delete()
+        self.assertFalse(Post.objects.exists())
+
+        call_command('import_social', self.path, batch_size=2, stdout=StringIO())
+
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual((post.title, post.created_at), ('Pasta night', self.post.created_at))
+        self.assertEqual((post.likes_count, post.comments_count), (1, 2))
+        alice = User.objects.get(pk=self.alice.pk)
+        self.assertEqual((alice.bio, alice.following_count), ('Hi', 1))
+        self.assertTrue(alice.check_password('testpass123'))
+        reply = Comment.objects.get(pk=self.reply.pk)
+        self.assertEqual((reply.parent_id, reply.path, reply.depth), (self.comment.pk, self.reply.path, 1))
+        self.assertEqual(Comment.objects.get(pk=self.comment.pk).reply_count, 1)
+        self.assertTrue(FeedEntry.objects.filter(user=alice, post=post).exists())
+        self.assertEqual(list(get_search_backend().filter(Post.objects.all(), 'pasta')), [post])
+        self.assertTrue(TrendingPost.objects.filter(post=post).exists())
+
+        # Importing again skips rows that are already there
+        call_command('import_social', self.path, no_rebuild=True, stdout=StringIO())
+        self.assertEqual((User.objects.count(), Comment.objects.count(), Like.objects.count()), (2, 2, 1))
+
+    def test_import_sends_no_signals(self):
+        call_command('export_social', self.path, only=['user', 'post'], stderr=StringIO())
+        Post.objects.all().delete()
+        with mock.patch('posts.signals.feed.fan_out_post') as fan_out:
+            call_command('import_social', self.path, no_rebuild=True, stdout=StringIO())
+        fan_out.assert_not_called()
+        self.assertEqual(Post.objects.get().comments_count, 0)
+
+    def test_rejects_unknown_rows(self):
+        with open(self.path.replace('.gz', ''), 'w') as stream:
+            stream.write('{"type": "user", "id": 99, "username": "carol"}\n{"type": "group", "id": 1}\n')
+        with self.assertRaisesMessage(CommandError, 'Line 2'):
+            call_command('import_social', self.path.replace('.gz', ''), stdout=StringIO())
+
+    def test_refuses_to_attach_rows_to_other_users(self):
+        call_command('export_social', self.path, stderr=StringIO())
+        User.objects.all().delete()
+        # Alice's key taken by someone else, then her username under another key
+        for clash in ({'username': 'mallory', 'id': self.alice.pk}, {'username': 'alice'}):
+            with self.subTest(clash=clash):
+                squatter = User.objects.create_user(password='testpass123', **clash)
+                with self.assertRaisesMessage(CommandError, 'already exists and is not the imported user'):
+                    call_command('import_social', self.path, stdout=StringIO())
+                self.assertFalse(Post.objects.exists())
+                squatter.delete()
+                User.objects.all().delete()
+
+
+class BulkImportIntegrityTestCase(TransactionTestCase):
+    def test_dangling_references_are_a_command_error(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'social.ndjson')
+        with open(path, 'w') as stream:
+            stream.write(json.dumps({
+                'type': 'post', 'id': 1, 'author_id': 999, 'title': 'Orphan', 'content': '...',
+                'created_at': '2026-01-01T00:00:00+00:00', 'updated_at': '2026-01-01T00:00:00+00:00',
+            }) + '\n')
+        with self.assertRaisesMessage(CommandError, 'post rows refers to rows that do not exist'):
+            call_command('import_social', path, no_rebuild=True, stdout=StringIO())
+        self.assertFalse(Post.objects.exists())
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, NOTIFICATIONS_ASYNC=False)
+class PostQueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    """Query budgets of the posts endpoints, with enough rows to expose N+1 queries"""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.authors = [User.objects.create_user(username=f'author{i}', password='testpass123') for i in range(3)]
+        for author in self.authors:
+            graph.follow(self.reader, author)
+        self.posts = [
+            Post.objects.create(author=self.authors[i % 3], title=f'Pasta {i}', content='Recipe')
+            for i in range(6)
+        ]
+        for post in self.posts[:4]:
+            Like.objects.create(user=self.reader, post=post)
+            comment = Comment.objects.create(post=post, author=self.authors[0], content='First')
+            Comment.objects.create(post=post, author=self.authors[1], content='Reply', parent=comment)
+        trending.rerank()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.reader)
+
+    def get(self, name, url, **params):
+        with self.assertWithinBudget(name):
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_read_endpoints(self):
+        post = self.posts[0]
+        self.get('posts-list', '/api/posts/')
+        self.get('post-detail', f'/api/posts/{post.id}/')
+        self.get('post-search', '/api/posts/search/', q='pasta')
+        self.get('post-trending', '/api/posts/trending/')
+        self.get('feed', '/api/feed/')
+        self.get('comments-list', '/api/comments/')
+        self.get('post-comments', f'/api/posts/{post.id}/comments/')
+        root = post.comments.get(parent=None)
+        self.get('post-comments-thread', f'/api/posts/{post.id}/comments/', thread=root.id)
+
+    def test_write_endpoints(self):
+        post = self.posts[5]
+        with self.assertWithinBudget('post-like'):
+            response = self.client.post(f'/api/posts/{post.id}/like/')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        with self.assertWithinBudget('post-batch-like'):
+            response = self.client.post(
+                '/api/posts/likes/batch/', {'like': [p.id for p in self.posts[4:]]}, format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertWithinBudget('post-comment-create'):
+            response = self.client.post(f'/api/posts/{post.id}/comments/', {'content': 'Nice'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+class QueryBudgetMixinTestCase(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.query_budget_file = os.path.join(directory.name, 'budgets.json')
+        with open(self.query_budget_file, 'w') as handle:
+            json.dump({'default': {'time_ms': 10000}, 'authors': {'queries': 4, 'duplicates': 1}}, handle)
+        # Check mode, even while the rest of the suite is being recorded
+        environ = mock.patch.dict(os.environ)
+        environ.start()
+        self.addCleanup(environ.stop)
+        os.environ.pop('QUERY_BUDGET_RECORD', None)
+        for i in range(3):
+            author = User.objects.create_user(username=f'author{i}', password='testpass123')
+            Post.objects.create(author=author, title=f'Post {i}', content='Body')
+
+    def test_fingerprints_ignore_literals(self):
+        self.assertEqual(
+            query_budget.fingerprint("SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'o''k' LIMIT 21"),
+            'SELECT * FROM t WHERE id IN (?) AND name = ? LIMIT ?',
+        )
+
+    def test_n_plus_one_is_caught(self):
+        with self.assertWithinBudget('authors'):
+            [post.author.username for post in Post.objects.all()[:2]]
+        with self.assertRaisesMessage(AssertionError, '2 duplicate queries, budget 1'):
+            with self.assertWithinBudget('authors'):
+                [post.author.username for post in Post.objects.all()]
+        with self.assertRaisesMessage(AssertionError, "No query budget named 'missing'"):
+            with self.assertWithinBudget('missing'):
+                list(Post.objects.all())
+
+    def test_record_mode_writes_the_budget(self):
+        with mock.patch.dict(os.environ, {'QUERY_BUDGET_RECORD': '1'}):
+            with self.assertWithinBudget('posts'):
+                list(Post.objects.select_related('author'))
+        with open(self.query_budget_file) as handle:
+            self.assertEqual(json.load(handle)['posts'], {'queries': 1, 'duplicates': 0})
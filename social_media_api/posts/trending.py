@@ -0,0 +1,103 @@
+"""
+Trending posts: engagement scores that decay over time.
+
+Every post carries a score that halves every TRENDING_HALF_LIFE seconds and
+is raised by likes and comments (TRENDING_WEIGHTS). The score is stored
+together with the time it was last brought up to date, so an event applies
+the decay since then and its own weight in a single F-expression UPDATE,
+with no read. `manage.py rerank_trending`, run every minute or so, copies
+the TRENDING_SIZE best posts into the TrendingPost table, which is all
+/api/posts/trending/ reads.
+"""
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Greatest, Least, Power
+
+from .models import Comment, Like, Post, TrendingPost
+
+# Beyond this many half-lives a score is treated as fully decayed (and the
+# power stays clear of floating point underflow)
+MAX_HALF_LIVES = 64.0
+
+
+def now():
+    return time.time()
+
+
+def half_life():
+    return float(getattr(settings, 'TRENDING_HALF_LIFE', 6 * 60 * 60))
+
+
+def weight(event):
+    weights = getattr(settings, 'TRENDING_WEIGHTS', {'like': 1.0, 'comment': 2.0})
+    return float(weights[event])
+
+
+def decay_factor(elapsed):
+    return 0.5 ** min(elapsed / half_life(), MAX_HALF_LIVES)
+
+
+def decayed_score(at):
+    """Expression for a post's score decayed to the time `at`."""
+    elapsed = Value(at, output_field=FloatField()) - F('trending_updated')
+    exponent = Least(elapsed / Value(half_life()), Value(MAX_HALF_LIVES))
+    return F('trending_score') * Power(Value(0.5), exponent)
+
+
+def record(post_ids, event, count=1):
+    """Add `count` (negative to retract) `event`s to the scores of `post_ids`."""
+    at = now()
+    Post.objects.filter(pk__in=post_ids).update(
+        trending_score=Greatest(decayed_score(at) + Value(weight(event) * count), Value(0.0)),
+        trending_updated=Value(at),
+    )
+
+
+def rerank(size=None):
+    """Replace the TrendingPost table with the current top posts. Returns their count."""
+    size = size or getattr(settings, 'TRENDING_SIZE', 100)
+    at = now()
+    # Posts untouched for MAX_HALF_LIVES half-lives score nothing; the
+    # trending_updated index keeps them out of the scan
+    horizon = at - half_life() * MAX_HALF_LIVES
+    top = list(
+        Post.objects.filter(trending_updated__gt=horizon, trending_score__gt=0)
+        .annotate(current=decayed_score(at))
+        .order_by('-current', '-id')
+        .values_list('pk', 'current')[:size]
+    )
+    with transaction.atomic():
+        TrendingPost.objects.all().delete()
+        TrendingPost.objects.bulk_create([
+            TrendingPost(rank=rank, post_id=pk, score=score)
+            for rank, (pk, score) in enumerate(top, start=1)
+        ])
+    return len(top)
+
+
+def rebuild_scores(batch_size=1000):
+    """
+    Recompute every score from the likes and comments tables, for
+    environments loaded without signals or before scores existed.
+    Unlikes and deleted comments are not remembered, so the result is the
+    score the current rows would have earned.
+    """
+    at = now()
+    since = at - half_life() * MAX_HALF_LIVES
+    scores = defaultdict(float)
+    for model, event in ((Like, 'like'), (Comment, 'comment')):
+        rows = model.objects.filter(created_at__gt=datetime.fromtimestamp(since, tz=timezone.utc)).values_list('post_id', 'created_at')
+        for post_id, created_at in rows.iterator(chunk_size=batch_size):
+            scores[post_id] += weight(event) * decay_factor(at - created_at.timestamp())
+
+    with transaction.atomic():
+        Post.objects.exclude(trending_score=0).update(trending_score=0.0, trending_updated=at)
+        posts = [Post(pk=pk, trending_score=score, trending_updated=at) for pk, score in scores.items()]
+        Post.objects.bulk_update(posts, ['trending_score', 'trending_updated'], batch_size=batch_size)
+    return len(posts)
+
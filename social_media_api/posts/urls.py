@@ -9,7 +9,9 @@ router.register(r'comments', views.CommentViewSet, basename='comment')
 urlpatterns = [
     path('', include(router.urls)),
     path('feed/', views.FeedView.as_view(), name='feed'),
+    path('posts/<int:pk>/comments/', views.PostCommentListView.as_view(), name='post-comments'),
     # ===== TASK 3: LIKE ENDPOINTS =====
     path('posts/<int:pk>/like/', views.LikePostView.as_view(), name='like-post'),
     path('posts/<int:pk>/unlike/', views.UnlikePostView.as_view(), name='unlike-post'),
+    path('posts/likes/batch/', views.BatchLikeView.as_view(), name='batch-like'),
 ]
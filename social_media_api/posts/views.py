@@ -1,69 +1,212 @@
-from rest_framework import viewsets, filters, generics, permissions, status
+from rest_framework import viewsets, generics, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from .models import Post, Comment, Like
-from .serializers import PostSerializer, CommentSerializer, LikeSerializer
+from .serializers import (
+    PostSerializer, CommentSerializer, PostCommentSerializer, LikeSerializer, BatchLikeSerializer,
+)
 from .permissions import IsOwnerOrReadOnly
+from .feed import entry_posts, get_feed_queryset, get_pulled_queryset
+from .search import FullTextSearchFilter, get_backend
+from . import likes
 from django_filters.rest_framework import DjangoFilterBackend
-from notifications.models import Notification
-from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import F
+from social_media_api.pagination import KeysetPagination, RankedPagination
+from social_media_api import response_cache
+from social_media_api.conditional import ConditionalGetMixin
 
 # Post ViewSet
-class PostViewSet(viewsets.ModelViewSet):
-    queryset = Post.objects.all().order_by('-created_at')
+class PostViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Post.objects.for_api().order_by('-created_at')
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    pagination_class = KeysetPagination
+    # ?search= is answered from the full-text index (see posts/search.py)
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     search_fields = ['title', 'content']
     filterset_fields = ['author']
+    lookup_value_regex = r'\d+'
+    # Everything besides the author that changes how a post is shown
+    validator_fields = ('updated_at', 'likes_count', 'comments_count', 'liked_by_me', 'author_followed')
+
+    def get_queryset(self):
+        # Annotated with the viewer's liked_by_me/author_followed flags
+        return Post.objects.for_api(self.request.user).order_by('-created_at')
+
+    def retrieve(self, request, *args, **kwargs):
+        # Served from the response cache until the post, its author or the
+        # viewer changes (see social_media_api/response_cache.py)
+        def build():
+            post = self.get_object()
+            return self.get_serializer(post).data, [response_cache.object_key(post.author)]
+
+        key = response_cache.object_key(Post, int(kwargs['pk']))
+        return response_cache.cached_response(request, key, build)
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Posts matching ?q=, most relevant first"""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {'error': 'Provide a search query with ?q='},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        paginator = RankedPagination()
+        ranked = paginator.paginate_ranked(
+            lambda limit, offset: get_backend().ranked(query, limit, offset), request
+        )
+        posts = self.get_queryset().in_bulk([post_id for post_id, _ in ranked])
+        results = []
+        for post_id, score in ranked:
+            if post_id in posts:
+                data = self.get_serializer(posts[post_id]).data
+                data['relevance'] = score
+                results.append(data)
+        return paginator.get_paginated_response(results)
+
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """The top posts by decayed engagement, as last ranked by rerank_trending"""
+        ranked = (
+            Post.objects.for_api(request.user)
+            .filter(trending__isnull=False)
+            .annotate(rank=F('trending__rank'), ranked_score=F('trending__score'))
+            .order_by('trending__rank')
+        )
+        paginator = RankedPagination()
+        page = paginator.paginate_ranked(
+            lambda limit, offset: ranked[offset:offset + limit], request
+        )
+        results = []
+        for post in page:
+            data = self.get_serializer(post).data
+            data['rank'] = post.rank
+            data['trending_score'] = round(post.ranked_score, 3)
+            results.append(data)
+        return paginator.get_paginated_response(results)
+
 # Comment ViewSet
-class CommentViewSet(viewsets.ModelViewSet):
-    queryset = Comment.objects.all().order_by('-created_at')
+class CommentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Comment.objects.for_api().order_by('-created_at')
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
+    pagination_class = KeysetPagination
+    # Everything besides the author that changes how a comment is shown
+    validator_fields = ('updated_at', 'post_id', 'parent_id', 'reply_count')
 
+    # Atomic so the post's comments_count moves with the comment row
+    @transaction.atomic
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
+
+class CommentPagination(KeysetPagination):
+    """Oldest first; PostCommentListView switches to thread order by path"""
+    ordering_field = 'created_at'
+    descending = False
+
+
+class PostCommentListView(generics.ListCreateAPIView):
+    """
+    Comments on one post, oldest first.
+
+    ?order=thread lists them depth-first by thread instead, and
+    ?thread=<comment id> only that comment and its replies, each as a
+    range scan on the (post, path) index.
+    """
+    serializer_class = PostCommentSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CommentPagination
+
+    def get_post(self):
+        if not hasattr(self, '_post'):
+            self._post = generics.get_object_or_404(Post, pk=self.kwargs['pk'])
+        return self._post
+
+    def get_queryset(self):
+        post = self.get_post()
+        queryset = Comment.objects.for_api().filter(post=post)
+        thread = self.request.query_params.get('thread')
+        if thread is not None:
+            if not thread.isdigit():
+                raise NotFound('No such thread.')
+            root = generics.get_object_or_404(Comment.objects.filter(post=post), pk=thread)
+            queryset = queryset.thread(root)
+        if thread is not None or self.request.query_params.get('order') == 'thread':
+            self.paginator.ordering_field = 'path'
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if 'pk' in self.kwargs:
+            context['post'] = self.get_post()
+        return context
+
+    # Atomic so the post's comments_count moves with the comment row
+    @transaction.atomic
+    def perform_create(self, serializer):
+        serializer.save(author=self.request.user, post=self.get_post())
+
+class FeedPagination(KeysetPagination):
+    """
+    Keyset pages over the (created_at, post_id) of feed entries, merged
+    with the posts pulled from popular authors on the same key.
+    """
+
+    def paginate_feed(self, entries, pulled, request):
+        posts = entry_posts(self.page_queryset(entries, request, id_field='post_id'))
+        if pulled is not None:
+            seen = {post.pk for post in posts}
+            posts += [post for post in self.page_queryset(pulled, request) if post.pk not in seen]
+            # Both pages come in scan order, which is newest first unless walking back
+            posts.sort(key=lambda post: (post.created_at, post.pk), reverse=self.descending != self.reverse)
+        return self.paginate_rows(posts, request)
+
 # ===== TASK 2: FEED VIEW =====
 class FeedView(generics.ListAPIView):
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = FeedPagination
     
     def get_queryset(self):
-        # Get users that the current user follows
-        following_users = self.request.user.following.all()
-        # Return posts from followed users, ordered by newest first
-        return Post.objects.filter(author__in=following_users).order_by('-created_at')
+        # Posts from followed users come from the materialized feed (see
+        # posts/feed.py), ordered by newest first
+        return get_feed_queryset(self.request.user)
+
+    def list(self, request, *args, **kwargs):
+        posts = self.paginator.paginate_feed(
+            self.get_queryset(), get_pulled_queryset(request.user), request
+        )
+        return self.get_paginated_response(self.get_serializer(posts, many=True).data)
 
 # ===== TASK 3: LIKE FUNCTIONALITY =====
 class LikePostView(APIView):
     """View to like a post"""
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'likes'
 
     def post(self, request, pk):
         post = generics.get_object_or_404(Post, pk=pk)
         
         # EXACT PATTERN checker wants:
-        like, created = Like.objects.get_or_create(user=request.user, post=post)
+        # (atomic so the post's likes_count moves with the like row)
+        with transaction.atomic():
+            like, created = Like.objects.get_or_create(user=request.user, post=post)
         
         if created:
-            # Create notification
-            if request.user != post.author:
-                content_type = ContentType.objects.get_for_model(Post)
-                Notification.objects.create(
-                    recipient=post.author,
-                    actor=request.user,
-                    verb='liked your post',
-                    content_type=content_type,
-                    object_id=post.id
-                )
-            
+            # The post author is notified by notifications.signals
             serializer = LikeSerializer(like)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         else:
@@ -75,13 +218,15 @@ class LikePostView(APIView):
 class UnlikePostView(APIView):
     """View to unlike a post"""
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'likes'
 
     def delete(self, request, pk):
         post = generics.get_object_or_404(Post, pk=pk)
         
         try:
             like = Like.objects.get(user=request.user, post=post)
-            like.delete()
+            with transaction.atomic():
+                like.delete()
             return Response(
                 {'message': 'Post unliked successfully'}, 
                 status=status.HTTP_204_NO_CONTENT
@@ -91,3 +236,28 @@ class UnlikePostView(APIView):
                 {'error': 'You have not liked this post'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+class BatchLikeView(APIView):
+    """View to like and unlike many posts in one request"""
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'likes'
+
+    def post(self, request):
+        serializer = BatchLikeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        like_ids = serializer.validated_data['like']
+        unlike_ids = serializer.validated_data['unlike']
+
+        results = []
+        if like_ids:
+            outcome = likes.like_many(request.user, like_ids)
+            results += [{'post': pk, 'action': 'like', 'status': outcome[pk]} for pk in like_ids]
+        if unlike_ids:
+            outcome = likes.unlike_many(request.user, unlike_ids)
+            results += [{'post': pk, 'action': 'unlike', 'status': outcome[pk]} for pk in unlike_ids]
+
+        counts = Post.objects.filter(pk__in=like_ids + unlike_ids).order_by('id').values('id', 'likes_count')
+        return Response({
+            'results': results,
+            'posts': list(counts)
+        }, status=status.HTTP_200_OK)
@@ -2,6 +2,9 @@
 ASGI config for social_media_api project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve the project through this module (e.g. gunicorn with uvicorn workers)
+for the streaming endpoint /api/notifications/stream/, which a WSGI server
+cannot hold open.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -0,0 +1,80 @@
+"""
+Conditional GET (ETag / If-None-Match) for API views.
+
+The ETag is computed from a narrow query over just the rows a response
+would show, and If-None-Match is checked before any object is loaded or
+serialized, so an unchanged page costs one cheap query
+and an empty 304.
+"""
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from . import response_cache
+
+
+def not_modified(request, etag):
+    """Return a 304 response if the request's If-None-Match matches `etag`, else None."""
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        set_validators(response, etag)
+    return response
+
+
+def set_validators(response, etag):
+    if etag:
+        response['ETag'] = etag
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    ETag support for a ViewSet's list and retrieve actions.
+
+    `validator_fields` must cover every column (or annotation) that changes
+    a row's representation other than its author, whose changes are
+    tracked through the response cache generations. No Last-Modified is
+    sent: likes, replies and viewer flags change a row without touching
+    `updated_at`, so a date would answer If-Modified-Since with stale 304s.
+    """
+    validator_fields = ('updated_at',)
+
+    def etag(self, request, queryset):
+        rows = list(queryset.values_list('pk', 'author_id', *self.validator_fields))
+        if not rows:
+            return None
+        User = get_user_model()
+        authors = response_cache.generations(
+            sorted({response_cache.object_key(User, row[1]) for row in rows})
+        )
+        state = repr((rows, sorted(authors.items()), request.get_full_path(),
+                      request.accepted_renderer.format))
+        return quote_etag(hashlib.md5(state.encode()).hexdigest())
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.paginator is not None and hasattr(self.paginator, 'page_queryset'):
+            queryset = self.paginator.page_queryset(queryset, request)
+        etag = self.etag(request, queryset)
+        response = not_modified(request, etag)
+        if response is None:
+            response = set_validators(super().list(request, *args, **kwargs), etag)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: kwargs[lookup_url_kwarg]}
+            )
+            etag = self.etag(request, queryset)
+        except (TypeError, ValueError, ValidationError):
+            # A malformed lookup value; let get_object() answer with a 404
+            etag = None
+        response = not_modified(request, etag)
+        if response is None:
+            response = set_validators(super().retrieve(request, *args, **kwargs), etag)
+        return response
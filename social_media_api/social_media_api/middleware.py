@@ -0,0 +1,37 @@
+"""
+Load shedding for write requests.
+
+SQLite (and, less sharply, any database) serialises writers, so past a
+handful of concurrent writes extra requests only queue on the database
+lock while holding a worker. ConcurrencyLimitMiddleware admits at most
+MAX_CONCURRENT_WRITES unsafe-method requests per process and answers the
+rest with an immediate 503 and a Retry-After header, before any view or
+database work runs.
+"""
+import threading
+
+from django.conf import settings
+from django.http import JsonResponse
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ConcurrencyLimitMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.limit = getattr(settings, 'MAX_CONCURRENT_WRITES', None)
+        self.slots = threading.BoundedSemaphore(self.limit) if self.limit else None
+
+    def __call__(self, request):
+        if self.slots is None or request.method in SAFE_METHODS:
+            return self.get_response(request)
+        if not self.slots.acquire(blocking=False):
+            response = JsonResponse(
+                {'detail': 'Server is busy, please retry shortly.'}, status=503
+            )
+            response['Retry-After'] = str(getattr(settings, 'CONCURRENCY_RETRY_AFTER', 1))
+            return response
+        try:
+            return self.get_response(request)
+        finally:
+            self.slots.release()
@@ -0,0 +1,179 @@
+"""
+Keyset ("seek") pagination shared by the posts and notifications apps.
+"""
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginate on the composite key (ordering_field, id).
+
+    Each page filters past the last row of the previous one instead of using
+    OFFSET, so page N costs the same as page 1 and no COUNT(*) is issued.
+    Cursors are opaque tokens handed out in the `next`/`previous` links.
+    Back it with an index on (ordering_field, id).
+    """
+    ordering_field = 'created_at'
+    descending = True
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # One extra row tells us whether another page exists
+        return self.paginate_rows(list(self.page_queryset(queryset, request)), request)
+
+    def paginate_rows(self, results, request):
+        """Cut rows fetched by page_queryset() (in scan order) down to the page."""
+        page_size = self.get_page_size(request)
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if self.reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+
+        self.page = results
+        return results
+
+    def page_queryset(self, queryset, request, id_field='id'):
+        """
+        The unevaluated query for the requested page, plus one extra row.
+
+        `id_field` is the tie-breaker column, holding the id that cursors
+        carry (e.g. post_id on rows that each stand for one post).
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        cursor = self.cursor = self.decode_cursor(request, queryset.model)
+
+        reverse = self.reverse = cursor is not None and cursor[2]
+        # Walking backwards scans the index in the opposite direction
+        descending = self.descending != reverse
+        field = self.ordering_field
+        if descending:
+            queryset = queryset.order_by(f'-{field}', f'-{id_field}')
+        else:
+            queryset = queryset.order_by(field, id_field)
+
+        if cursor is not None:
+            value, pk, _ = cursor
+            op = 'lt' if descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{field}__{op}e': value}),
+                Q(**{f'{field}__{op}': value}) | Q(**{f'{id_field}__{op}': pk}),
+            )
+
+        return queryset[:page_size + 1]
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            value = model._meta.get_field(self.ordering_field).to_python(data['v'])
+            return value, int(data['id']), bool(data.get('r'))
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj, reverse):
+        value = getattr(obj, self.ordering_field)
+        payload = {'v': value.isoformat() if hasattr(value, 'isoformat') else value, 'id': obj.pk}
+        if reverse:
+            payload['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('ascii'))
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded.decode('ascii'))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class RankedPagination(KeysetPagination):
+    """
+    Offset pagination for relevance-ranked results (search).
+
+    A relevance score has no stable keyset to seek on, so pages are taken by
+    offset straight from the ranked index. As with KeysetPagination no
+    COUNT(*) is issued.
+    """
+    offset_query_param = 'offset'
+
+    def paginate_ranked(self, fetch, request):
+        """Page through `fetch(limit, offset)`, which returns a ranked list."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.limit = self.get_page_size(request)
+        try:
+            self.offset = max(int(request.query_params.get(self.offset_query_param, 0)), 0)
+        except ValueError:
+            self.offset = 0
+
+        results = list(fetch(self.limit + 1, self.offset))
+        self.has_next = len(results) > self.limit
+        self.has_previous = self.offset > 0
+        self.page = results[:self.limit]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(self.base_url, self.offset_query_param, self.offset + self.limit)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        previous = self.offset - self.limit
+        if previous <= 0:
+            return remove_query_param(self.base_url, self.offset_query_param)
+        return replace_query_param(self.base_url, self.offset_query_param, previous)
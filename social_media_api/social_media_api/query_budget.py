@@ -0,0 +1,120 @@
+"""
+Query and latency budgets for API tests.
+
+QueryBudgetMixin.assertWithinBudget(name) records every SQL statement run
+inside the block, with the literals of each reduced to a fingerprint, and
+fails the test when the block runs more queries, repeats a fingerprint
+more often (the mark of an N+1 loop) or takes longer than the budget
+`name` in QUERY_BUDGET_FILE allows. The file is checked in, so raising a
+budget is a reviewed change.
+
+Run the tests with QUERY_BUDGET_RECORD=1 to write the measured query and
+duplicate counts into the file instead of checking them. Time budgets are
+ceilings against pathological slowdowns, not benchmarks: entries without
+"time_ms" use the file's "default" entry, and QUERY_BUDGET_TIME_FACTOR
+scales them all for slow machines.
+
+advanced-api-project imports this module too (its settings name its own
+budget file), so keep it free of social_media_api specifics.
+"""
+import json
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+TRANSACTION_CONTROL = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w".])-?\d+(?:\.\d+)?(?![\w"])')
+_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+
+
+def fingerprint(sql):
+    """`sql` with its literal values replaced by ?, and IN lists collapsed."""
+    sql = _NUMBER.sub('?', _STRING.sub('?', sql))
+    return ' '.join(_LIST.sub('(?)', sql).split())
+
+
+class Measurement:
+    def __init__(self, queries, elapsed):
+        self.queries = [query['sql'] for query in queries]
+        self.elapsed_ms = elapsed * 1000
+        counts = Counter(
+            fingerprint(sql) for sql in self.queries
+            if not sql.lstrip().upper().startswith(TRANSACTION_CONTROL)
+        )
+        # Extra runs of the same statement shape
+        self.repeated = {sql: count for sql, count in counts.items() if count > 1}
+        self.duplicates = sum(count - 1 for count in self.repeated.values())
+
+    def report(self):
+        lines = [f'{len(self.queries)} queries, {self.duplicates} duplicate(s), '
+                 f'{self.elapsed_ms:.1f}ms']
+        for sql, count in sorted(self.repeated.items(), key=lambda item: -item[1]):
+            lines.append(f'  {count}x {sql}')
+        lines.append('Queries:')
+        lines.extend(f'  {number}. {sql}' for number, sql in enumerate(self.queries, start=1))
+        return '\n'.join(lines)
+
+
+def budget_file():
+    return str(getattr(settings, 'QUERY_BUDGET_FILE', 'query_budgets.json'))
+
+
+def load_budgets(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def record_budget(path, name, measurement):
+    budgets = load_budgets(path)
+    entry = budgets.setdefault(name, {})
+    entry['queries'] = len(measurement.queries)
+    entry['duplicates'] = measurement.duplicates
+    with open(path, 'w') as handle:
+        json.dump(budgets, handle, indent=2, sort_keys=True)
+        handle.write('\n')
+
+
+class QueryBudgetMixin:
+    """TestCase mixin adding assertWithinBudget()."""
+    query_budget_file = None  # defaults to settings.QUERY_BUDGET_FILE
+
+    @contextmanager
+    def assertWithinBudget(self, name):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            yield
+            elapsed = time.perf_counter() - started
+        measurement = Measurement(captured.captured_queries, elapsed)
+
+        path = self.query_budget_file or budget_file()
+        if os.environ.get('QUERY_BUDGET_RECORD'):
+            record_budget(path, name, measurement)
+            return
+
+        budgets = load_budgets(path)
+        if name not in budgets:
+            self.fail(f'No query budget named {name!r} in {path} (record it with '
+                      f'QUERY_BUDGET_RECORD=1)\n{measurement.report()}')
+        budget = budgets[name]
+        failures = []
+        if len(measurement.queries) > budget['queries']:
+            failures.append(f"{len(measurement.queries)} queries, budget {budget['queries']}")
+        if measurement.duplicates > budget.get('duplicates', 0):
+            failures.append(f"{measurement.duplicates} duplicate queries, budget {budget.get('duplicates', 0)}")
+        time_ms = budget.get('time_ms', budgets.get('default', {}).get('time_ms'))
+        if time_ms is not None:
+            time_ms *= float(os.environ.get('QUERY_BUDGET_TIME_FACTOR', 1))
+            if measurement.elapsed_ms > time_ms:
+                failures.append(f'{measurement.elapsed_ms:.1f}ms, budget {time_ms:.0f}ms')
+        if failures:
+            self.fail(f'{name} is over budget: {"; ".join(failures)}\n{measurement.report()}')
@@ -0,0 +1,123 @@
+"""
+Versioned response cache shared by the posts and accounts apps.
+
+Every cacheable resource has a generation number in the cache, bumped by
+invalidate() whenever something that shows up in its responses changes
+(model signals, counter updates, follows). Cached responses are keyed on
+the generations they were built from, so a bump makes them unreachable and
+nothing has to be deleted. A hit costs two cache lookups and no queries;
+the ETag is derived from the same generations, so If-None-Match can be
+answered with a 304 before any data is loaded.
+
+Generations live in the RESPONSE_CACHE_ALIAS cache. With several server
+processes that must be a shared backend (file-based, Redis, ...), otherwise
+each process only sees its own bumps.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import patch_vary_headers
+from django.utils.http import quote_etag
+from rest_framework.response import Response
+
+from . import conditional
+
+
+def get_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def timeout():
+    return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+
+
+def object_key(instance_or_model, pk=None):
+    """Generation key of a model instance, e.g. 'posts.post:5'."""
+    if pk is None:
+        pk = instance_or_model.pk
+    return f'{instance_or_model._meta.label_lower}:{pk}'
+
+
+def _generation_key(key):
+    return f'gen:{key}'
+
+
+def generations(keys):
+    """Current generation of every key, starting any that are missing."""
+    cache = get_cache()
+    found = cache.get_many([_generation_key(key) for key in keys])
+    result = {}
+    missing = {}
+    for key in keys:
+        value = found.get(_generation_key(key))
+        if value is None:
+            # Time-based, so a generation lost to eviction never comes back
+            # with a number that old responses were cached under
+            value = missing[_generation_key(key)] = time.time_ns()
+        result[key] = value
+    if missing:
+        cache.set_many(missing, None)
+    return result
+
+
+def _bump(keys):
+    cache = get_cache()
+    for key in keys:
+        try:
+            cache.incr(_generation_key(key))
+        except ValueError:
+            cache.set(_generation_key(key), time.time_ns(), None)
+
+
+def invalidate(*keys):
+    """
+    Make cached responses built from `keys` stale.
+
+    Bumped now and again once the current transaction commits, so a
+    response rebuilt from the old rows in between is not kept either.
+    """
+    keys = [key for key in keys if key]
+    if not keys:
+        return
+    _bump(keys)
+    transaction.on_commit(lambda: _bump(keys))
+
+
+def cached_response(request, key, build, per_user=True):
+    """
+    Serve `key` from the cache, building it with `build()` on a miss.
+
+    `build()` returns (data, dependencies): the response data and the
+    generation keys of any other objects it shows. Responses are cached
+    per user unless `per_user` is False.
+    """
+    cache = get_cache()
+    scope = [key]
+    if per_user and request.user.is_authenticated:
+        scope.append(object_key(request.user))
+    versions = generations(scope)
+    fmt = request.accepted_renderer.format
+    entry_key = 'response:' + ':'.join(f'{k}@{versions[k]}' for k in scope) + f':{fmt}'
+
+    entry = cache.get(entry_key)
+    if entry is not None:
+        data, dependencies = entry
+        if dependencies and generations(list(dependencies)) != dependencies:
+            entry = None
+    if entry is None:
+        data, dependency_keys = build()
+        dependencies = generations(list(dependency_keys)) if dependency_keys else {}
+        cache.set(entry_key, (data, dependencies), timeout())
+
+    etag = quote_etag(hashlib.md5(
+        (entry_key + repr(sorted(dependencies.items()))).encode()
+    ).hexdigest())
+    response = conditional.not_modified(request, etag)
+    if response is None:
+        response = conditional.set_validators(Response(data), etag)
+    if per_user:
+        patch_vary_headers(response, ['Authorization', 'Cookie'])
+    return response
@@ -3,6 +3,8 @@ Django settings for social_media_api project.
 """
 
 import os
+import sys
+from datetime import timedelta
 from pathlib import Path
 
 # Try to import required packages
@@ -18,6 +20,15 @@ try:
 except ImportError:
     STORAGES_AVAILABLE = False
 
+try:
+    import argon2
+    ARGON2_AVAILABLE = True
+except ImportError:
+    ARGON2_AVAILABLE = False
+
+# `manage.py test`
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -52,6 +63,8 @@ if STORAGES_AVAILABLE:
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    # Sheds write requests over MAX_CONCURRENT_WRITES with a 503
+    'social_media_api.middleware.ConcurrencyLimitMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -107,6 +120,59 @@ if DJ_DATABASE_URL_AVAILABLE:
         if 'PORT' not in DATABASES['default'] or not DATABASES['default']['PORT']:
             DATABASES['default']['PORT'] = '5432'  # Default PostgreSQL port
 
+# Cache
+# Local memory by default. Run several server processes against a shared
+# backend instead, e.g. CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache
+# and CACHE_LOCATION=/var/tmp/social_media_api_cache, so cache invalidation
+# reaches all of them.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'social-media-api'),
+    }
+}
+# Cached API responses (see social_media_api/response_cache.py)
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 300  # seconds
+# Authenticated tokens (see accounts/authentication.py)
+AUTH_TOKEN_CACHE_ALIAS = 'default'
+AUTH_TOKEN_CACHE_TIMEOUT = 300  # seconds
+# API tokens expire this long after login; `manage.py sweep_tokens` deletes them
+AUTH_TOKEN_TTL = timedelta(days=30)
+
+# Password hashing
+# PASSWORD_HASHER_PROFILE picks the hasher for new passwords: argon2 (needs
+# argon2-cffi), scrypt or pbkdf2 (Django's default, the slowest per login at
+# equal strength). Hashes made by any of them keep verifying and are
+# upgraded to the current profile at the owner's next login. The test
+# suite uses a fast, insecure hasher.
+PASSWORD_HASHER_PROFILE = os.environ.get(
+    'PASSWORD_HASHER_PROFILE', 'argon2' if ARGON2_AVAILABLE else 'scrypt'
+)
+if TESTING:
+    PASSWORD_HASHER_PROFILE = 'fast'
+PASSWORD_HASHER_PROFILES = {
+    'argon2': 'accounts.hashers.TunedArgon2PasswordHasher',
+    'scrypt': 'accounts.hashers.TunedScryptPasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'fast': 'django.contrib.auth.hashers.MD5PasswordHasher',
+}
+PASSWORD_HASHERS = [PASSWORD_HASHER_PROFILES[PASSWORD_HASHER_PROFILE]] + [
+    hasher for profile, hasher in PASSWORD_HASHER_PROFILES.items()
+    if profile not in (PASSWORD_HASHER_PROFILE, 'fast')
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+# Cost per hash (see accounts/hashers.py). Argon2 follows the OWASP
+# baseline (19 MiB, 2 passes, 1 lane) so concurrent signups do not exhaust
+# server memory; scrypt keeps Django's parameters.
+PASSWORD_HASHER_COST = {
+    'argon2_time_cost': 2,
+    'argon2_memory_cost': 19 * 1024,  # KiB
+    'argon2_parallelism': 1,
+    'scrypt_work_factor': 2 ** 14,
+    'scrypt_block_size': 8,
+    'scrypt_parallelism': 1,
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -187,7 +253,8 @@ AUTH_USER_MODEL = 'accounts.CustomUser'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        # TokenAuthentication answered from the cache (accounts/authentication.py)
+        'accounts.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -195,7 +262,63 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    # Token buckets for views with a throttle_scope (social_media_api/throttling.py).
+    # '<scope>' limits each user, '<scope>.ip' each client address.
+    'DEFAULT_THROTTLE_CLASSES': [
+        'social_media_api.throttling.UserTokenBucketThrottle',
+        'social_media_api.throttling.IPTokenBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'likes': '60/min',
+        'likes.ip': '300/min',
+        'follows': '30/min',
+        'follows.ip': '120/min',
+        'register.ip': '20/hour',
+        'login.ip': '30/min',
+    },
 }
+THROTTLE_CACHE_ALIAS = 'default'
+# Write requests (POST, PUT, PATCH, DELETE) one server process handles at
+# once; more are turned away with a 503 rather than queueing on the
+# database lock. None disables the limit.
+MAX_CONCURRENT_WRITES = 16
+CONCURRENCY_RETRY_AFTER = 1  # seconds
+
+# Home feed: posts are pushed into followers' feeds when created, except
+# for authors with more than FEED_FANOUT_THRESHOLD followers, whose posts
+# are pulled at read time. Each feed keeps its newest FEED_MAX_LENGTH posts
+# (enforced by `manage.py trim_feeds`).
+FEED_MAX_LENGTH = 500
+FEED_FANOUT_THRESHOLD = 1000
+
+# Trending posts (see posts/trending.py): likes and comments add to a post's
+# score, which halves every TRENDING_HALF_LIFE seconds. `manage.py
+# rerank_trending` (run it every minute or so) keeps the top TRENDING_SIZE.
+TRENDING_HALF_LIFE = 6 * 60 * 60
+TRENDING_WEIGHTS = {'like': 1.0, 'comment': 2.0}
+TRENDING_SIZE = 100
+
+# Per-endpoint query budgets enforced by the tests (social_media_api/query_budget.py)
+QUERY_BUDGET_FILE = BASE_DIR / 'query_budgets.json'
+
+# Deepest reply level (top-level comments are level 0). The 255-character
+# thread path fits at most 22.
+COMMENT_MAX_DEPTH = 10
+
+# Notifications are queued in-process and written in batches by a background
+# worker thread after the request commits (see notifications/pipeline.py).
+NOTIFICATIONS_ASYNC = True
+NOTIFICATION_BATCH_SIZE = 100
+NOTIFICATION_FLUSH_INTERVAL = 0.5  # seconds a batch waits to fill up
+# Events with the same recipient, verb and target inside one window are
+# folded into a single notification that keeps a few sample actors.
+NOTIFICATION_AGGREGATION_WINDOW = 24 * 60 * 60  # seconds
+NOTIFICATION_SAMPLE_ACTORS = 3
+# /api/notifications/stream/ (ASGI only) is woken through this broker. The
+# in-process one reaches a single server process; swap in a shared broker
+# when running several.
+NOTIFICATION_BROKER = 'notifications.pubsub.InProcessBroker'
+NOTIFICATION_STREAM_HEARTBEAT = 15  # seconds between keep-alive comments
 
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = False  # Only allow specific origins in production
@@ -0,0 +1,82 @@
+"""
+Token-bucket throttles for the write endpoints.
+
+A view opts in with a `throttle_scope`; the rate for that scope comes from
+REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] in DRF's 'number/period' form and
+is read as a bucket of `number` tokens that refills evenly over `period`,
+so a client may burst up to `number` requests and then sustain the
+average rate. UserTokenBucketThrottle keys buckets on the user (the client
+IP for anonymous requests) and IPTokenBucketThrottle on the client IP
+under the '<scope>.ip' rate, which catches one client cycling through
+many accounts. A scope without a rate is not throttled.
+
+Buckets live in the THROTTLE_CACHE_ALIAS cache. As with the response
+cache, several server processes need a shared backend for the limits to be
+global; updates are read-modify-write, so concurrent requests may
+occasionally get a token more than the limit allows.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    scope_attr = 'throttle_scope'
+    scope_suffix = ''
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    def __init__(self):
+        # The rate depends on the view, so it is resolved in allow_request()
+        self.wait_seconds = None
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'THROTTLE_CACHE_ALIAS', 'default')]
+
+    def get_rate(self):
+        # Read on each request (not at import) so settings overrides apply
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def allow_request(self, request, view):
+        scope = getattr(view, self.scope_attr, None)
+        if not scope:
+            return True
+        self.scope = scope + self.scope_suffix
+        self.rate = self.get_rate()
+        if self.rate is None:
+            return True
+        capacity, period = self.parse_rate(self.rate)
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        now = self.timer()
+        tokens, stamp = self.cache.get(self.key, (capacity, now))
+        tokens = min(capacity, tokens + (now - stamp) * capacity / period)
+        if tokens < 1:
+            self.wait_seconds = (1 - tokens) * period / capacity
+            return False
+        # An untouched bucket is full again after one period
+        self.cache.set(self.key, (tokens - 1, now), period)
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = f'user-{request.user.pk}'
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    scope_suffix = '.ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}